@@ -1,10 +1,17 @@
 import requests
 import json
-from bs4 import BeautifulSoup
 import time
 import os
+import sys
 from datetime import datetime
 
+# 共享模块位于项目根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article_extractor import extract_article_text
+from page_cache import PageCache
+
+page_cache = PageCache()
+
 
 def get_article_content(url, max_retries=3):
     """获取微信文章的文字内容"""
@@ -20,38 +27,14 @@ def get_article_content(url, max_retries=3):
     for attempt in range(max_retries):
         try:
             print(f"  正在获取文章内容 (尝试 {attempt + 1}/{max_retries})...")
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-
-            # 使用 BeautifulSoup 解析 HTML
-            soup = BeautifulSoup(response.content, 'html.parser', from_encoding='utf-8')
-
-            # 微信文章的主要内容通常在 #js_content 中
-            content_div = soup.find('div', id='js_content')
-            if content_div:
-                # 移除所有 script 和 style 标签
-                for script in content_div(["script", "style"]):
-                    script.decompose()
-
-                # 获取纯文本
-                content = content_div.get_text(separator='\n', strip=True)
-
-                # 清理多余的空行
-                lines = [line.strip() for line in content.split('\n') if line.strip()]
-                content = '\n'.join(lines)
-
-                return content
-            else:
-                # 如果没找到 #js_content，尝试其他可能的选择器
-                title_elem = soup.find('h1', class_='rich_media_title') or soup.find('h1')
-                content_elem = soup.find('div', class_='rich_media_content') or soup.find('div', class_='content')
-
-                if content_elem:
-                    content = content_elem.get_text(separator='\n', strip=True)
-                    lines = [line.strip() for line in content.split('\n') if line.strip()]
-                    return '\n'.join(lines)
-                else:
-                    return "无法提取文章内容，可能页面结构已改变"
+            html = page_cache.fetch(url, headers=headers, timeout=15)
+
+            # 微信文章的主要内容通常在 #js_content 中，找不到时尝试其他可能的选择器
+            content = extract_article_text(html)
+            if content is None:
+                page_cache.invalidate(url)
+                return "无法提取文章内容，可能页面结构已改变"
+            return content
 
         except requests.exceptions.RequestException as e:
             print(f"  请求失败 (尝试 {attempt + 1}): {e}")
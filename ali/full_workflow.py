@@ -7,11 +7,18 @@ import requests
 import json
 import time
 import os
+import sys
 from datetime import datetime
-from bs4 import BeautifulSoup
 from gemini_agent import GeminiAgent
 from feishu_pusher import FeishuPusher
 
+# 共享模块位于项目根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from article_extractor import extract_article_text
+from page_cache import PageCache
+
+page_cache = PageCache()
+
 
 def get_latest_articles(url="http://47.99.87.139:4000/feeds/all.json", limit=3):
     """获取最新的几篇文章"""
@@ -37,19 +44,12 @@ def get_article_content(url, max_retries=2):
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser', from_encoding='utf-8')
-        content_div = soup.find('div', id='js_content')
-
-        if content_div:
-            for script in content_div(["script", "style"]):
-                script.decompose()
-            content = content_div.get_text(separator='\n', strip=True)
-            lines = [line.strip() for line in content.split('\n') if line.strip()]
-            return '\n'.join(lines)
-        else:
-            return None
+        html = page_cache.fetch(url, headers=headers, timeout=15)
+        content = extract_article_text(html, selectors=(('id', 'js_content'),))
+        if not content:
+            # 验证页、空页面等不保留缓存，下次重新下载
+            page_cache.invalidate(url)
+        return content
     except Exception as e:
         print(f"      ⚠️ 获取内容失败: {e}")
         return None
@@ -0,0 +1,125 @@
+"""
+微信文章正文提取
+优先使用 lxml (C 实现) 直接定位 #js_content / .rich_media_content，
+不可用或解析失败时回退到 BeautifulSoup(html.parser)，两条路径输出的文本一致。
+"""
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# 正文区域的查找顺序：(属性, 值)
+WECHAT_CONTENT_SELECTORS = (
+    ('id', 'js_content'),
+    ('class', 'rich_media_content'),
+    ('class', 'content'),
+)
+DEFAULT_STRIP_TAGS = ("script", "style")
+
+
+def extract_article_text(html, selectors=WECHAT_CONTENT_SELECTORS, strip_tags=DEFAULT_STRIP_TAGS,
+                         fallback_to_page=False):
+    """
+    从文章 HTML (bytes 或 str) 中提取正文纯文本，每行一段。
+    找不到正文区域时：fallback_to_page=True 返回整页文本，否则返回 None。
+    """
+    if lxml_html is not None:
+        try:
+            return extract_with_lxml(html, selectors, strip_tags, fallback_to_page)
+        except Exception:
+            pass
+    return extract_with_bs4(html, selectors, strip_tags, fallback_to_page)
+
+
+def extract_with_bs4(html, selectors=WECHAT_CONTENT_SELECTORS, strip_tags=DEFAULT_STRIP_TAGS,
+                     fallback_to_page=False):
+    """原有的 BeautifulSoup 实现（兜底路径，也作为基准对照）"""
+    if isinstance(html, bytes):
+        soup = BeautifulSoup(html, 'html.parser', from_encoding='utf-8')
+    else:
+        soup = BeautifulSoup(html, 'html.parser')
+
+    # 移除干扰元素
+    for tag in soup(list(strip_tags)):
+        tag.decompose()
+
+    content_div = None
+    for attr, value in selectors:
+        if attr == 'id':
+            content_div = soup.find('div', id=value)
+        else:
+            content_div = soup.find('div', class_=value)
+        if content_div:
+            break
+
+    if content_div:
+        text = content_div.get_text(separator='\n', strip=True)
+    elif fallback_to_page:
+        text = soup.get_text(separator='\n', strip=True)
+    else:
+        return None
+
+    return _clean_lines(text)
+
+
+def extract_with_lxml(html, selectors=WECHAT_CONTENT_SELECTORS, strip_tags=DEFAULT_STRIP_TAGS,
+                      fallback_to_page=False):
+    """lxml 快速路径：不构建 Python 对象树，XPath 直达正文节点"""
+    if isinstance(html, bytes):
+        root = lxml_html.document_fromstring(html, parser=lxml_html.HTMLParser(encoding='utf-8'))
+    else:
+        root = lxml_html.document_fromstring(html)
+
+    strip_tags = frozenset(strip_tags)
+    content_div = None
+    for attr, value in selectors:
+        if attr == 'id':
+            candidates = root.xpath('//div[@id=$value]', value=value)
+        else:
+            candidates = root.xpath(
+                "//div[contains(concat(' ', normalize-space(@class), ' '), concat(' ', $value, ' '))]",
+                value=value,
+            )
+        # 与先删除干扰元素再查找的行为保持一致
+        for candidate in candidates:
+            if not any(ancestor.tag in strip_tags for ancestor in candidate.iterancestors()):
+                content_div = candidate
+                break
+        if content_div is not None:
+            break
+
+    if content_div is None:
+        if not fallback_to_page:
+            return None
+        content_div = root
+
+    strings = (s.strip() for s in _iter_text_nodes(content_div, strip_tags))
+    return _clean_lines('\n'.join(s for s in strings if s))
+
+
+def _iter_text_nodes(root, strip_tags):
+    """按文档顺序遍历文本节点，跳过注释和 strip_tags 中的元素（保留其后的 tail 文本）"""
+    stack = [(root, False)]
+    while stack:
+        node, closing = stack.pop()
+        if closing:
+            if node is not root and node.tail:
+                yield node.tail
+            continue
+
+        stack.append((node, True))
+        # 注释 / 处理指令的 tag 不是字符串
+        if not isinstance(node.tag, str) or node.tag in strip_tags:
+            continue
+        if node.text:
+            yield node.text
+        for child in reversed(node):
+            stack.append((child, False))
+
+
+def _clean_lines(text):
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    return '\n'.join(lines)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+音频编码方案对比：统计每种方案每小时音频的上传字节数、需要的片段数（请求数）和编码耗时。
+与正式流程走同一条路径（MediaHandler.download_audio / encode_audio），得到的文件大小与线上一致。
+
+用法：
+    python benchmark_audio_profiles.py https://www.youtube.com/watch?v=...   # 完整下载流程（每种方案各下载一次）
+    python benchmark_audio_profiles.py path/to/audio.m4a     # 只对本地音轨做编码
+    python benchmark_audio_profiles.py                       # 生成 10 分钟合成音频（仅用于验证流程，数据不代表真实语音）
+    python benchmark_audio_profiles.py audio.m4a --limit-mb 25
+"""
+
+import argparse
+import math
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+from media_handler import AUDIO_PROFILES, MediaHandler
+
+
+def encode(handler, source, profile, out_dir):
+    """用指定方案走正式流程：链接走 download_audio，本地文件走 encode_audio"""
+    handler.audio_profile = profile
+    if source.startswith(("http://", "https://")):
+        return handler.download_audio(source, out_dir)
+    return handler.encode_audio(source, os.path.join(out_dir, "encoded"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音频编码方案对比")
+    parser.add_argument("audio", nargs="?", help="视频链接或源音频/视频文件")
+    parser.add_argument("--minutes", type=int, default=10, help="未指定源文件时生成的合成音频时长（分钟）")
+    parser.add_argument("--limit-mb", type=float, default=float(os.getenv("MEDIA_MAX_SEGMENT_MB", "24")),
+                        help="单次上传大小上限 (MB)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_profiles_")
+    try:
+        source = args.audio
+        if not source:
+            source = os.path.join(work_dir, "source.wav")
+            print(f"🎼 生成 {args.minutes} 分钟合成音频（正弦波 + 噪声 + 间歇停顿）...")
+            subprocess.run([
+                MediaHandler._binary('ffmpeg'), '-v', 'error', '-f', 'lavfi',
+                '-i', f"aevalsrc='if(lt(mod(t,9),8),0.4*sin(220*2*PI*t)*sin(3*PI*t)+0.1*(random(0)-0.5),0)':s=44100:c=stereo:d={args.minutes * 60}",
+                '-y', source
+            ], check=True)
+
+        handler = MediaHandler()
+        limit_bytes = args.limit_mb * 1024 * 1024
+        print(f"📄 {source}  单次上传上限 {args.limit_mb:g} MB\n")
+        print(f"   {'方案':<10} {'MB/小时':>9} {'片段数/小时':>11} {'每段最长(分钟)':>14} {'编码 CPU(s)':>11} {'墙钟(s)':>8}")
+
+        for name, profile in AUDIO_PROFILES.items():
+            before = resource.getrusage(resource.RUSAGE_CHILDREN)
+            start = time.perf_counter()
+            encoded = encode(handler, source, profile, work_dir)
+            if not encoded:
+                print(f"   {name:<10} 失败（ffmpeg 可能缺少 {profile['encoder']} 编码器）")
+                continue
+            elapsed = time.perf_counter() - start
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+            duration = handler.get_audio_duration(encoded)
+            if not duration:
+                print(f"   {name:<10} 无法读取编码结果的时长")
+                continue
+            size = os.path.getsize(encoded)
+            bytes_per_hour = size / duration * 3600
+            segments_per_hour = max(1, math.ceil(bytes_per_hour / limit_bytes))
+            max_segment_minutes = limit_bytes / (size / duration) / 60
+            print(f"   {name:<10} {bytes_per_hour / 1024 / 1024:>9.1f} {segments_per_hour:>11} "
+                  f"{max_segment_minutes:>14.0f} {cpu:>11.2f} {elapsed:>8.2f}")
+            os.remove(encoded)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
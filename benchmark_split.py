@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+音频分割基准测试：旧实现（ffmpeg -f null 解码探测时长 + 每段一个 ffmpeg 进程 -ss/-t）
+对比 ffprobe 读元数据 + segment 复用器单次切分。统计子进程 CPU 时间与磁盘读取块数。
+
+用法：
+    python benchmark_split.py                    # 生成 2 小时 64kbps 测试音频
+    python benchmark_split.py path/to/audio.mp3
+    python benchmark_split.py --drop-caches      # 每轮前清空页缓存（需要 root），使磁盘读取数有意义
+"""
+
+import argparse
+import os
+import re
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+from media_handler import MediaHandler
+
+
+def legacy_split(filepath, out_dir, max_duration=300):
+    """旧版 split_audio 的处理方式"""
+    ffmpeg = MediaHandler._binary('ffmpeg')
+    result = subprocess.run([ffmpeg, '-i', filepath, '-f', 'null', '-'], capture_output=True, text=True)
+    hours, minutes, seconds = map(float, re.search(r'Duration: (\d+):(\d+):(\d+\.\d+)', result.stderr).groups())
+    total_seconds = hours * 3600 + minutes * 60 + seconds
+
+    files = []
+    for i in range(int(total_seconds // max_duration) + 1):
+        out_name = os.path.join(out_dir, f"legacy_part_{i+1}.mp3")
+        subprocess.run([
+            ffmpeg, '-i', filepath, '-ss', str(i * max_duration), '-t', str(max_duration),
+            '-c', 'copy', '-y', out_name
+        ], capture_output=True)
+        files.append(out_name)
+    return files
+
+
+def single_pass_split(filepath, out_dir, max_duration=300):
+    # 在输出目录放一个源文件的符号链接，使片段写到 out_dir
+    link = os.path.join(out_dir, "source" + os.path.splitext(filepath)[1])
+    os.symlink(os.path.abspath(filepath), link)
+    return [segment['path'] for segment in MediaHandler().split_audio_segments(link, max_duration)]
+
+
+def drop_caches():
+    subprocess.run(['sync'])
+    with open('/proc/sys/vm/drop_caches', 'w') as f:
+        f.write('3\n')
+
+
+def measure(label, func, filepath, segment_seconds, should_drop_caches):
+    if should_drop_caches:
+        drop_caches()
+    out_dir = tempfile.mkdtemp(prefix="bench_split_")
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    try:
+        segments = func(filepath, out_dir, segment_seconds)
+        elapsed = time.perf_counter() - start
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    blocks = after.ru_inblock - before.ru_inblock
+    print(f"   {label:<20} 片段: {len(segments):>3}   墙钟: {elapsed:6.2f}s   "
+          f"子进程 CPU: {cpu:6.2f}s   磁盘读取: {blocks * 512 / 1024 / 1024:8.1f} MB ({blocks} 块)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音频分割基准测试")
+    parser.add_argument("audio", nargs="?", help="测试音频（默认生成 2 小时正弦波 mp3）")
+    parser.add_argument("--minutes", type=int, default=120, help="生成测试音频的时长（分钟）")
+    parser.add_argument("--segment", type=int, default=300, help="片段时长（秒）")
+    parser.add_argument("--drop-caches", action="store_true", help="每轮前清空页缓存（需要 root）")
+    args = parser.parse_args()
+
+    generated = None
+    filepath = args.audio
+    if not filepath:
+        generated = tempfile.mkdtemp(prefix="bench_audio_")
+        filepath = os.path.join(generated, "sample.mp3")
+        print(f"🎼 生成 {args.minutes} 分钟测试音频...")
+        subprocess.run([
+            MediaHandler._binary('ffmpeg'), '-v', 'error', '-f', 'lavfi',
+            '-i', 'sine=frequency=440:sample_rate=16000', '-t', str(args.minutes * 60),
+            '-ac', '1', '-b:a', '64k', '-y', filepath
+        ], check=True)
+
+    try:
+        print(f"📄 {filepath}  ({os.path.getsize(filepath) / 1024 / 1024:.1f} MB)")
+        measure("旧实现 (多进程)", legacy_split, filepath, args.segment, args.drop_caches)
+        measure("单次 segment 切分", single_pass_split, filepath, args.segment, args.drop_caches)
+    finally:
+        if generated:
+            shutil.rmtree(generated, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
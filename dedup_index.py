@@ -0,0 +1,161 @@
+import datetime
+import hashlib
+import os
+import re
+from collections import Counter
+from state_store import get_state_store
+
+SIMHASH_BITS = 64
+# 64 位指纹分成 4 段，每段 16 位：汉明距离 <= 3 的两个指纹至少有一段完全相同
+BAND_COUNT = 4
+BAND_BITS = SIMHASH_BITS // BAND_COUNT
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+# 全文指纹表；开头部分的指纹单独一张表，用于转录尚未完成时的提前查重（表名 -> 索引名前缀）
+FULL_TABLE = "content_fingerprints"
+HEAD_TABLE = "content_head_fingerprints"
+FINGERPRINT_TABLES = {FULL_TABLE: "idx_fingerprint", HEAD_TABLE: "idx_head_fingerprint"}
+
+
+def simhash(text, shingle_size=3):
+    """对文本做 SimHash：去掉空白和标点后按字符 n-gram 切片，按出现次数加权"""
+    normalized = _NON_WORD.sub("", text.lower())
+    if len(normalized) < shingle_size:
+        shingles = Counter([normalized]) if normalized else Counter()
+    else:
+        shingles = Counter(normalized[i:i + shingle_size] for i in range(len(normalized) - shingle_size + 1))
+
+    weights = [0] * SIMHASH_BITS
+    for shingle, count in shingles.items():
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            if value >> bit & 1:
+                weights[bit] += count
+            else:
+                weights[bit] -= count
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _to_signed(value):
+    """SQLite INTEGER 是有符号 64 位"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+class DedupIndex:
+    """近重复内容指纹索引（SimHash + 分段索引），保存在 state.db"""
+
+    def __init__(self, store=None, max_distance=None, min_chars=None):
+        self.store = store or get_state_store()
+        self.enabled = os.getenv("DEDUP_ENABLED", "true").lower() != "false"
+        # 汉明距离不超过该值视为重复（分段索引保证 <= 3 不会漏查）
+        self.max_distance = min(max_distance or int(os.getenv("DEDUP_MAX_DISTANCE", "3")), BAND_COUNT - 1)
+        # 过短的文本指纹不可靠，不参与去重
+        self.min_chars = min_chars or int(os.getenv("DEDUP_MIN_CHARS", "200"))
+        # 开头指纹取前多少字符（长视频转录到第一个分块时就能查重，不必等全文）
+        self.head_chars = int(os.getenv("DEDUP_HEAD_CHARS", "2000"))
+        self._init_schema()
+
+    def _init_schema(self):
+        band_columns = ",\n".join(f"band{i} INTEGER NOT NULL" for i in range(BAND_COUNT))
+        with self.store.lock:
+            for table, index_prefix in FINGERPRINT_TABLES.items():
+                band_indexes = "\n".join(
+                    f"CREATE INDEX IF NOT EXISTS {index_prefix}_band{i} ON {table} (band{i});"
+                    for i in range(BAND_COUNT)
+                )
+                self.store.conn.executescript(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        simhash INTEGER NOT NULL,
+                        {band_columns},
+                        source TEXT,
+                        item_id TEXT,
+                        title TEXT,
+                        duplicate_of INTEGER,
+                        created_at TEXT NOT NULL
+                    );
+                    {band_indexes}
+                """)
+            self.store.conn.commit()
+
+    @staticmethod
+    def _bands(fingerprint):
+        mask = (1 << BAND_BITS) - 1
+        return [fingerprint >> (i * BAND_BITS) & mask for i in range(BAND_COUNT)]
+
+    def find_duplicate(self, text, head=False):
+        """
+        查找与 text 近重复的已有内容，返回 {'id', 'source', 'item_id', 'title', 'distance'} 或 None。
+        head=True 时只比较开头 head_chars 个字符（text 可以是尚未转录完的前半部分）
+        """
+        if not self.enabled or not text or len(text) < self.min_chars:
+            return None
+        table = FULL_TABLE
+        if head:
+            # 不足 head_chars 的前缀与登记时的开头不是同一段文本，无法比较
+            if len(text) < self.head_chars:
+                return None
+            text, table = text[:self.head_chars], HEAD_TABLE
+
+        fingerprint = simhash(text)
+        bands = self._bands(fingerprint)
+        where = " OR ".join(f"band{i} = ?" for i in range(BAND_COUNT))
+        with self.store.lock:
+            rows = self.store.conn.execute(
+                f"SELECT id, simhash, source, item_id, title, duplicate_of FROM {table} WHERE {where}",
+                bands,
+            ).fetchall()
+
+        best = None
+        for row_id, stored, source, item_id, title, duplicate_of in rows:
+            distance = hamming_distance(fingerprint, _to_unsigned(stored))
+            if distance <= self.max_distance and (best is None or distance < best['distance']):
+                best = {
+                    # 统一关联到最早的原始记录
+                    'id': duplicate_of or row_id,
+                    'source': source,
+                    'item_id': item_id,
+                    'title': title,
+                    'distance': distance,
+                }
+        return best
+
+    def add(self, text, source, item_id, title="", duplicate_of=None):
+        """登记一条内容的指纹（全文 + 开头）；duplicate_of 为其对应原始记录的 id。返回全文指纹的 id"""
+        if not self.enabled or not text or len(text) < self.min_chars:
+            return None
+
+        row_id = self._insert(FULL_TABLE, text, source, item_id, title, duplicate_of)
+        if len(text) >= self.head_chars:
+            # 开头指纹的 duplicate_of 同样指向全文表中的原始记录
+            self._insert(HEAD_TABLE, text[:self.head_chars], source, item_id, title, duplicate_of or row_id)
+        return row_id
+
+    def _insert(self, table, text, source, item_id, title, duplicate_of):
+        fingerprint = simhash(text)
+        bands = self._bands(fingerprint)
+        with self.store.lock:
+            cursor = self.store.conn.execute(
+                f"""
+                INSERT INTO {table}
+                    (simhash, {", ".join(f"band{i}" for i in range(BAND_COUNT))}, source, item_id, title, duplicate_of, created_at)
+                VALUES (?, {", ".join("?" for _ in range(BAND_COUNT))}, ?, ?, ?, ?, ?)
+                """,
+                (_to_signed(fingerprint), *bands, source, item_id, title, duplicate_of, str(datetime.datetime.now())),
+            )
+            self.store.commit()
+        return cursor.lastrowid
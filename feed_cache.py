@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import datetime
+from http_client import get_session
+
+FEED_CACHE_FILE = "feed_cache.json"
+
+
+class FeedCache:
+    """订阅源条件请求缓存：按 URL 记录 ETag / Last-Modified / 内容哈希"""
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file or os.getenv("FEED_CACHE_FILE", FEED_CACHE_FILE)
+        self.lock = threading.Lock()
+        self.entries = self.load()
+
+    def load(self):
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception:
+                return {}
+        return {}
+
+    def save(self):
+        # 先写临时文件再替换，别的进程不会读到写了一半的 JSON
+        tmp_path = f"{self.cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.cache_file)
+
+    def fetch(self, url, headers=None, timeout=15, conditional=True, deadline=None):
+        """
+        条件请求订阅源。
+        内容有变化时返回响应体 (bytes)；服务端返回 304，或没有校验头但内容哈希未变时返回 None。
+        conditional=False 时总是完整下载并返回响应体（仍会刷新缓存）。
+        deadline（time.time() 时间戳）之前没下载完时抛出 TimeoutError，且不更新缓存，下次照常完整拉取。
+        网络或 HTTP 错误直接抛出，由调用方处理。
+        """
+        with self.lock:
+            cached = dict(self.entries.get(url, {})) if conditional else {}
+
+        request_headers = dict(headers or {})
+        if cached.get('etag'):
+            request_headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            request_headers['If-Modified-Since'] = cached['last_modified']
+
+        # stream=True 时连接要等响应关闭才归还连接池，304 和错误状态码也一样
+        with get_session().get(url, headers=request_headers, timeout=timeout, stream=deadline is not None) as response:
+            now = str(datetime.datetime.now())
+
+            if response.status_code == 304:
+                self._update(url, {'checked_at': now})
+                return None
+
+            response.raise_for_status()
+            body = response.content if deadline is None else self._read_before(response, deadline)
+            response_headers = response.headers
+        body_hash = hashlib.sha256(body).hexdigest()
+        changed = body_hash != cached.get('body_hash')
+
+        entry = {
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'body_hash': body_hash,
+            'checked_at': now,
+        }
+        if changed:
+            entry['changed_at'] = now
+        self._update(url, entry)
+
+        return body if changed or not conditional else None
+
+    @staticmethod
+    def _read_before(response, deadline):
+        """分块读取响应体：单次读写超时挡不住慢速滴流的连接，超过截止时间就放弃（响应由调用方关闭）"""
+        # read1 有数据就返回，不必等满一整块（urllib3 1.x 没有 read1 时退回 read）
+        read = getattr(response.raw, 'read1', None) or response.raw.read
+        chunks = []
+        while True:
+            if time.time() > deadline:
+                raise TimeoutError("下载订阅超时")
+            chunk = read(64 * 1024, decode_content=True)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def invalidate(self, url):
+        """清除某个源的缓存（例如响应体解析失败时），下次请求会完整下载"""
+        with self.lock:
+            self.entries = self.load()
+            if self.entries.pop(url, None) is not None:
+                self.save()
+
+    def _update(self, url, values):
+        # 写之前重新读一遍文件，只改自己这个 URL：其他实例/进程写入的源不会被整份覆盖掉
+        with self.lock:
+            self.entries = self.load()
+            entry = self.entries.setdefault(url, {})
+            entry.update(values)
+            self.save()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_feed_cache():
+    """进程内共享的默认订阅缓存"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = FeedCache()
+        return _default_cache
@@ -0,0 +1,59 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from rss_manager import RSSManager
+
+
+class FeedPoller:
+    """并发轮询所有 RSS 源，单个源慢或挂掉不会拖住其它源"""
+
+    def __init__(self, rss_manager=None, max_workers=None, timeout=None):
+        self.rss_manager = rss_manager or RSSManager()
+        self.max_workers = max_workers or int(os.getenv("RSS_POLL_CONCURRENCY", "16"))
+        # 单个订阅源的超时（秒）
+        self.timeout = timeout or float(os.getenv("RSS_POLL_TIMEOUT", "20"))
+
+    def _poll_one(self, rss_url):
+        """
+        拉取并解析单个订阅，整个下载限制在单源超时内：
+        请求超时只限制单次读写，慢速滴流的连接由截止时间兜底；超时的下载不会写入订阅缓存
+        """
+        start = time.time()
+        try:
+            entries = self.rss_manager.fetch_entries(
+                rss_url, timeout=self.timeout, raise_errors=True, deadline=start + self.timeout
+            )
+        except TimeoutError:
+            raise TimeoutError(f"超时 (>{self.timeout:.0f}s)")
+        return entries, time.time() - start
+
+    def poll_all(self, rss_urls):
+        """
+        并发拉取并解析所有订阅，按输入顺序返回结果列表：
+        [{'url': ..., 'entries': [...], 'error': None 或错误信息, 'elapsed': 秒}]
+        """
+        rss_urls = [url.strip() for url in rss_urls if url and url.strip()]
+        if not rss_urls:
+            return []
+
+        start = time.time()
+        max_workers = max(1, min(self.max_workers, len(rss_urls)))
+
+        # 每个任务自己限制在单源超时内返回，排队的源不会被前面挂起的源拖住
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(self._poll_one, url): url for url in rss_urls}
+            for future, url in futures.items():
+                result = {'url': url, 'entries': [], 'error': None, 'elapsed': None}
+                try:
+                    result['entries'], result['elapsed'] = future.result()
+                except Exception as e:
+                    result['error'] = str(e)
+                results[url] = result
+
+        ordered = [results[url] for url in rss_urls]
+        failed = [r for r in ordered if r['error']]
+        print(f"📡 轮询 {len(ordered)} 个订阅完成，用时 {time.time() - start:.1f}s，失败 {len(failed)} 个")
+        for r in failed:
+            print(f"   ❌ {r['url']}: {r['error']}")
+        return ordered
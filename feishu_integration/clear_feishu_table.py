@@ -1,12 +1,17 @@
-import requests
 import os
+import sys
 import time
 from dotenv import load_dotenv
 
+# 共享模块位于项目根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import get_session
+
 load_dotenv()
 
 class FeishuTableClearer:
     def __init__(self):
+        self.session = get_session()
         self.app_id = os.getenv("FEISHU_APP_ID")
         self.app_secret = os.getenv("FEISHU_APP_SECRET")
         self.app_token = os.getenv("FEISHU_BITABLE_APP_TOKEN")
@@ -21,7 +26,7 @@ class FeishuTableClearer:
 
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -60,7 +65,7 @@ class FeishuTableClearer:
                 params["page_token"] = page_token
 
             try:
-                resp = requests.get(url, headers=headers, params=params)
+                resp = self.session.get(url, headers=headers, params=params)
                 if resp.status_code == 200:
                     data = resp.json()
                     if data.get("code") == 0:
@@ -103,7 +108,7 @@ class FeishuTableClearer:
         }
 
         try:
-            resp = requests.delete(url, headers=headers)
+            resp = self.session.delete(url, headers=headers)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get("code") == 0:
@@ -1,14 +1,19 @@
-import requests
 import os
+import sys
 import time
 import json
 import uuid
 from dotenv import load_dotenv
 
+# 共享模块位于项目根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import get_session
+
 load_dotenv()
 
 class FeishuFieldCreator:
     def __init__(self):
+        self.session = get_session()
         self.app_id = os.getenv("FEISHU_APP_ID")
         self.app_secret = os.getenv("FEISHU_APP_SECRET")
         self.app_token = os.getenv("FEISHU_BITABLE_APP_TOKEN")
@@ -23,7 +28,7 @@ class FeishuFieldCreator:
 
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -70,7 +75,7 @@ class FeishuFieldCreator:
         }
 
         try:
-            resp = requests.post(url, headers=headers, params=params, json=field_data)
+            resp = self.session.post(url, headers=headers, params=params, json=field_data)
 
             if resp.status_code == 200:
                 data = resp.json()
@@ -1,12 +1,17 @@
-import requests
 import os
+import sys
 import time
 from dotenv import load_dotenv
 
+# 共享模块位于项目根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import get_session
+
 load_dotenv()
 
 class LearningFieldCreator:
     def __init__(self):
+        self.session = get_session()
         self.app_id = os.getenv("FEISHU_APP_ID")
         self.app_secret = os.getenv("FEISHU_APP_SECRET")
         self.app_token = os.getenv("FEISHU_BITABLE_APP_TOKEN")
@@ -21,7 +26,7 @@ class LearningFieldCreator:
 
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -49,7 +54,7 @@ class LearningFieldCreator:
             "Content-Type": "application/json"
         }
 
-        resp = requests.get(url, headers=headers)
+        resp = self.session.get(url, headers=headers)
         if resp.status_code == 200:
             data = resp.json()
             if data.get("code") == 0:
@@ -62,7 +67,7 @@ class LearningFieldCreator:
                         field_name = field.get("field_name")
 
                         delete_url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token}/tables/{self.table_id}/fields/{field_id}"
-                        delete_resp = requests.delete(delete_url, headers=headers)
+                        delete_resp = self.session.delete(delete_url, headers=headers)
 
                         if delete_resp.status_code == 200:
                             delete_data = delete_resp.json()
@@ -141,7 +146,7 @@ class LearningFieldCreator:
 
             print(f"[{i}/{len(fields_config)}] 正在创建字段: {field_name}")
 
-            resp = requests.post(url, headers=headers, json=payload)
+            resp = self.session.post(url, headers=headers, json=payload)
 
             if resp.status_code == 200:
                 data = resp.json()
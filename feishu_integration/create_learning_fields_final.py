@@ -1,12 +1,17 @@
-import requests
 import os
+import sys
 import time
 from dotenv import load_dotenv
 
+# 共享模块位于项目根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import get_session
+
 load_dotenv()
 
 class FinalFieldCreator:
     def __init__(self):
+        self.session = get_session()
         self.app_id = os.getenv("FEISHU_APP_ID")
         self.app_secret = os.getenv("FEISHU_APP_SECRET")
         # 使用刚创建的学习记录表格
@@ -22,7 +27,7 @@ class FinalFieldCreator:
 
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -57,7 +62,7 @@ class FinalFieldCreator:
 
         print(f"🔧 创建字段: {field_name} (类型: {field_type})")
 
-        resp = requests.post(url, headers=headers, json=payload)
+        resp = self.session.post(url, headers=headers, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
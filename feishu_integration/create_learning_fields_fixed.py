@@ -1,13 +1,18 @@
-import requests
 import os
+import sys
 import time
 import json
 from dotenv import load_dotenv
 
+# 共享模块位于项目根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import get_session
+
 load_dotenv()
 
 class LearningFieldCreatorFixed:
     def __init__(self):
+        self.session = get_session()
         self.app_id = os.getenv("FEISHU_APP_ID")
         self.app_secret = os.getenv("FEISHU_APP_SECRET")
         # 使用刚创建的学习记录表格
@@ -23,7 +28,7 @@ class LearningFieldCreatorFixed:
 
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -68,7 +73,7 @@ class LearningFieldCreatorFixed:
         print(f"📤 请求URL: {url}")
         print(f"📋 请求体: {json.dumps(payload, ensure_ascii=False, indent=2)}")
 
-        resp = requests.post(url, headers=headers, json=payload)
+        resp = self.session.post(url, headers=headers, json=payload)
 
         print(f"📥 响应状态: {resp.status_code}")
         print(f"📋 响应内容: {resp.text}")
@@ -148,7 +153,7 @@ class LearningFieldCreatorFixed:
 
         print(f"请求体: {json.dumps(payload, ensure_ascii=False, indent=2)}")
 
-        resp = requests.post(url, headers=headers, json=payload)
+        resp = self.session.post(url, headers=headers, json=payload)
 
         print(f"响应状态: {resp.status_code}")
         print(f"响应内容: {resp.text}")
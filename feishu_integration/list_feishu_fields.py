@@ -1,13 +1,18 @@
-import requests
 import os
+import sys
 import time
 import json
 from dotenv import load_dotenv
 
+# 共享模块位于项目根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import get_session
+
 load_dotenv()
 
 class FeishuFieldLister:
     def __init__(self):
+        self.session = get_session()
         self.app_id = os.getenv("FEISHU_APP_ID")
         self.app_secret = os.getenv("FEISHU_APP_SECRET")
         self.app_token = os.getenv("FEISHU_BITABLE_APP_TOKEN")
@@ -22,7 +27,7 @@ class FeishuFieldLister:
 
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -191,7 +196,7 @@ class FeishuFieldLister:
                 if page_token:
                     params["page_token"] = page_token
 
-                resp = requests.get(url, headers=headers, params=params)
+                resp = self.session.get(url, headers=headers, params=params)
 
                 if resp.status_code == 200:
                     data = resp.json()
@@ -273,7 +278,7 @@ class FeishuFieldLister:
                 if page_token:
                     params["page_token"] = page_token
 
-                resp = requests.get(url, headers=headers, params=params)
+                resp = self.session.get(url, headers=headers, params=params)
 
                 if resp.status_code == 200:
                     data = resp.json()
@@ -310,7 +315,7 @@ class FeishuFieldLister:
         }
 
         try:
-            resp = requests.get(url, headers=headers)
+            resp = self.session.get(url, headers=headers)
 
             if resp.status_code == 200:
                 data = resp.json()
@@ -396,7 +401,7 @@ class FeishuFieldLister:
                 if page_token:
                     params["page_token"] = page_token
 
-                resp = requests.get(url, headers=headers, params=params)
+                resp = self.session.get(url, headers=headers, params=params)
 
                 if resp.status_code == 200:
                     data = resp.json()
@@ -519,7 +524,7 @@ class FeishuFieldLister:
                 if page_token:
                     params["page_token"] = page_token
 
-                resp = requests.get(url, headers=headers, params=params)
+                resp = self.session.get(url, headers=headers, params=params)
 
                 if resp.status_code == 200:
                     data = resp.json()
@@ -1,13 +1,18 @@
-import requests
 import os
+import sys
 import time
 import json
 from dotenv import load_dotenv
 
+# 共享模块位于项目根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import get_session
+
 load_dotenv()
 
 class RecordQuery:
     def __init__(self):
+        self.session = get_session()
         self.app_id = os.getenv("FEISHU_APP_ID")
         self.app_secret = os.getenv("FEISHU_APP_SECRET")
         self.app_token = os.getenv("FEISHU_BITABLE_APP_TOKEN")
@@ -22,7 +27,7 @@ class RecordQuery:
 
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -50,7 +55,7 @@ class RecordQuery:
         }
 
         try:
-            resp = requests.get(url, headers=headers)
+            resp = self.session.get(url, headers=headers)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get("code") == 0:
@@ -91,7 +96,7 @@ class RecordQuery:
 
         try:
             print("📋 正在查询记录...")
-            resp = requests.post(url, headers=headers, json=payload)
+            resp = self.session.post(url, headers=headers, json=payload)
 
             if resp.status_code == 200:
                 data = resp.json()
@@ -1,13 +1,18 @@
-import requests
 import os
+import sys
 import time
 import uuid
 from dotenv import load_dotenv
 
+# 共享模块位于项目根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import get_session
+
 load_dotenv()
 
 class DomainFieldUpdater:
     def __init__(self):
+        self.session = get_session()
         self.app_id = os.getenv("FEISHU_APP_ID")
         self.app_secret = os.getenv("FEISHU_APP_SECRET")
         self.app_token = os.getenv("FEISHU_BITABLE_APP_TOKEN")
@@ -22,7 +27,7 @@ class DomainFieldUpdater:
 
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -61,7 +66,7 @@ class DomainFieldUpdater:
                 params["page_token"] = page_token
 
             try:
-                resp = requests.get(url, headers=headers, params=params)
+                resp = self.session.get(url, headers=headers, params=params)
                 if resp.status_code == 200:
                     data = resp.json()
                     if data.get("code") == 0:
@@ -161,7 +166,7 @@ class DomainFieldUpdater:
         try:
             print(f"   📤 正在更新字段: {field_name} -> 多选类型")
             print(f"   📝 新选项: {[opt['name'] for opt in domain_options]}")
-            resp = requests.put(url, headers=headers, params=params, json=field_data)
+            resp = self.session.put(url, headers=headers, params=params, json=field_data)
 
             if resp.status_code == 200:
                 data = resp.json()
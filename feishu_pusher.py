@@ -1,13 +1,14 @@
-import requests
 import os
 import json
 import time
 from dotenv import load_dotenv
+from http_client import get_session
 
 load_dotenv()
 
 class FeishuPusher:
     def __init__(self):
+        self.session = get_session()
         self.app_id = os.getenv("FEISHU_APP_ID")
         self.app_secret = os.getenv("FEISHU_APP_SECRET")
         self.app_token = os.getenv("FEISHU_BITABLE_APP_TOKEN")
@@ -22,7 +23,7 @@ class FeishuPusher:
 
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -103,7 +104,7 @@ class FeishuPusher:
         clean_fields = {k: v for k, v in fields.items() if v is not None}
 
         try:
-            resp = requests.post(url, headers=headers, json={"fields": clean_fields})
+            resp = self.session.post(url, headers=headers, json={"fields": clean_fields})
             res_json = resp.json()
             if res_json.get('code') == 0:
                 print(f"   ✅ [飞书] 推送成功: {raw_data.get('title')[:10]}")
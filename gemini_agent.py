@@ -1,10 +1,19 @@
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from zhipuai import ZhipuAI
+from llm_cache import cached_chat_completion
+from llm_json import parse_cached_reply
+from rate_limiter import get_rate_limiter
+from text_chunker import estimate_tokens, input_token_budget, split_text
 
 load_dotenv()
 
+# 分析失败时返回的空结构带有该警告，is_analysis_ok 据此判断
+ANALYSIS_FAILED_WARNING = "AI分析失败"
+
+
 class GeminiAgent:
     def __init__(self):
         # 使用智谱AI API
@@ -23,6 +32,25 @@ class GeminiAgent:
             os.path.join(os.getcwd(), "markdown_runs"),
         )
 
+        # 单次分析的输出上限；正文按 token 预算分块（不超过上下文窗口减去输出上限和提示词预留），相邻块少量重叠
+        self.max_output_tokens = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "4000"))
+        self.chunk_tokens = min(
+            int(os.getenv("LLM_CHUNK_TOKENS", "24000")),
+            input_token_budget(self.model, self.max_output_tokens),
+        )
+        self.chunk_overlap_tokens = int(os.getenv("LLM_CHUNK_OVERLAP_TOKENS", "200"))
+        # 输出被截断时最多请求继续输出的次数；没有任何完整记录时，不少于该 tokens 的文本拆半重新分析
+        self.max_continuations = int(os.getenv("LLM_MAX_CONTINUATIONS", "2"))
+        self.min_split_tokens = int(os.getenv("LLM_MIN_SPLIT_TOKENS", "1500"))
+
+        # 长逐字稿分块并发分析数；所有智谱请求共享接口配额（每分钟请求数 / 允许的瞬时请求数）
+        self.chunk_concurrency = max(1, int(os.getenv("LLM_CHUNK_CONCURRENCY", "4")))
+        self.rate_limiter = get_rate_limiter(
+            "zhipu-chat",
+            float(os.getenv("ZHIPU_RPM", "30")),
+            int(os.getenv("ZHIPU_BURST", "4")),
+        )
+
         self.field_ids = {
             "lesson_id": "fldyHazqYW",
             "item_seq": "fldqwz6C4E",
@@ -54,8 +82,13 @@ class GeminiAgent:
         if not self.client:
             return self._get_empty_structure(self._get_lesson_id(lesson_meta, title))
 
-        # 截断过长文本
-        transcript = text_content[:30000]
+        # 超过单次分析预算的长文本分块分析后合并，不再截断
+        if not chunk:
+            chunks = self._split_transcript(text_content)
+            if len(chunks) > 1:
+                print(f"   ✂️ 内容约 {estimate_tokens(text_content, self.model)} tokens，超过单次分析预算 {self.chunk_tokens}，分 {len(chunks)} 块分析")
+                return self._analyze_long_content(chunks, title, source_type, original_link, lesson_meta, options)
+        transcript = text_content
 
         lesson_meta_payload = lesson_meta or {
             "lesson_id": self._get_lesson_id(lesson_meta, title),
@@ -89,8 +122,21 @@ class GeminiAgent:
         if chunk:
             request_payload["chunk"] = chunk
 
+        try:
+            result, report, finish_reason = self._request_analysis(request_payload)
+        except Exception as e:
+            print(f"   ❌ 智谱AI 分析失败: {e}")
+            return self._get_empty_structure(self._get_lesson_id(lesson_meta, title))
+
+        if (finish_reason == "length" or report["truncated"]) and isinstance(result, dict):
+            return self._complete_truncated(
+                result, report, request_payload, title, source_type, original_link, lesson_meta, options
+            )
+        return result
+
+    def _build_extraction_prompt(self, request_payload):
         request_json = json.dumps(request_payload, ensure_ascii=False)
-        prompt = f"""任务：从课程逐字稿中抽取学习记录，写入飞书多维表格字段。
+        return f"""任务：从课程逐字稿中抽取学习记录，写入飞书多维表格字段。
 要求：
 1) 输出 records 数组，每条 record 对应表格一行。
 2) 表格展示有限：标题<=18字；一句话总结<=45字；关键词<=8个；长内容统一写入“详情”。
@@ -106,9 +152,10 @@ class GeminiAgent:
 7) 每条记录给 0~2 条 evidence（逐字稿原句截取 + start/end char）。
 8) 链接字段输出为 {{\"text\": \"视频链接\", \"url\": \"https://...\"}}。
 9) records[].fields 必须使用 field_id，不要输出中文字段名。
-10) record_key 固定格式："{lesson_id}-{item_seq:03d}"。
+10) record_key 固定格式："{{lesson_id}}-{{item_seq:03d}}"。
 11) 若提供 chunk.start_offset，evidence 的 start_char/end_char 相对当前 chunk 即可（程序会统一修正）。
-12) 输出必须是 JSON 对象，结构如下：
+12) 若提供 continuation，说明上一次输出达到长度上限被截断：不要重复 continuation.already_extracted 中的记录，只输出剩余记录，item_seq 从 continuation.next_item_seq 开始。
+13) 输出必须是 JSON 对象，结构如下：
 {{
   "lesson_id": "...",
   "records": [
@@ -146,40 +193,96 @@ class GeminiAgent:
 {request_json}
 """
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,  # 从环境变量读取模型
-                messages=[
-                    {"role": "system", "content": "你是一个“飞书多维表格学习记录”抽取器。只返回严格JSON，不要输出任何解释或markdown外壳。"},
-                    {"role": "user", "content": prompt}
+    def _request_analysis(self, request_payload):
+        """发送一次抽取请求，返回 (解析结果, 解析报告, finish_reason)；接口或解析失败时抛出异常"""
+        response = cached_chat_completion(
+            self.client,
+            model=self.model,  # 从环境变量读取模型
+            messages=[
+                {"role": "system", "content": "你是一个“飞书多维表格学习记录”抽取器。只返回严格JSON，不要输出任何解释或markdown外壳。"},
+                {"role": "user", "content": self._build_extraction_prompt(request_payload)}
+            ],
+            temperature=0.2,
+            max_tokens=self.max_output_tokens,
+            rate_limiter=self.rate_limiter,
+        )
+        # 解析JSON（修复常见格式问题；输出被截断时保留完整的记录，不完整的回复不留在缓存中）
+        result, report = parse_cached_reply(response)
+        return result, report, response["finish_reason"]
+
+    def _complete_truncated(self, result, report, request_payload, title, source_type, original_link, lesson_meta, options):
+        """
+        输出达到 max_tokens 被截断时补全：已有完整记录则请求模型继续输出剩余记录并合并；
+        一条完整记录都没有时把文本拆成两半重新分析
+        """
+        records = [record for record in result.get("records") or [] if isinstance(record, dict)]
+        warnings = result.get("warnings") if isinstance(result.get("warnings"), list) else []
+        transcript = request_payload["transcript"]
+
+        if not records:
+            tokens = estimate_tokens(transcript, self.model)
+            if tokens >= self.min_split_tokens:
+                # 预算略多于一半，按句子边界通常切成两块
+                halves = split_text(transcript, tokens * 3 // 5, 0, self.model)
+                print(f"   ✂️ AI 输出被截断且没有完整记录，拆成 {len(halves)} 块重新分析")
+                return self._analyze_long_content(halves, title, source_type, original_link, lesson_meta, options)
+            warnings.append("AI输出被截断，未能恢复任何记录")
+            result["warnings"] = warnings
+            return result
+
+        recovered = len(records)
+        title_field = self.field_ids["title"]
+
+        def record_id(record):
+            fields = record.get("fields") if isinstance(record.get("fields"), dict) else {}
+            return fields.get(title_field) or record.get("record_key")
+
+        seen = {record_id(record) for record in records}
+        complete = False
+        for attempt in range(1, self.max_continuations + 1):
+            print(f"   🔁 AI 输出达到长度上限（已有 {len(records)} 条），请求继续输出剩余记录（第 {attempt} 次）...")
+            payload = dict(request_payload)
+            payload["continuation"] = {
+                "already_extracted": [
+                    {"record_key": record.get("record_key"), "title": record_id(record)} for record in records
                 ],
-                temperature=0.2,
-                max_tokens=4000
-            )
-
-            # 提取回复内容
-            content = response.choices[0].message.content.strip()
-
-            # 尝试解析JSON
+                "next_item_seq": len(records) + 1,
+            }
             try:
-                return json.loads(content)
-            except json.JSONDecodeError:
-                # 如果解析失败，尝试提取JSON部分
-                if "```json" in content:
-                    json_part = content.split("```json")[1].split("```")[0].strip()
-                    return json.loads(json_part)
-                elif "{" in content and "}" in content:
-                    # 提取第一个完整的JSON对象
-                    start = content.find("{")
-                    end = content.rfind("}") + 1
-                    json_part = content[start:end]
-                    return json.loads(json_part)
-                else:
-                    raise Exception("无法解析AI返回的JSON格式")
-
-        except Exception as e:
-            print(f"   ❌ 智谱AI 分析失败: {e}")
-            return self._get_empty_structure(self._get_lesson_id(lesson_meta, title))
+                more, more_report, finish_reason = self._request_analysis(payload)
+            except Exception as e:
+                print(f"   ❌ 继续输出请求失败: {e}")
+                break
+            more_records = more.get("records") if isinstance(more, dict) else None
+            new_records = [
+                record for record in more_records or []
+                if isinstance(record, dict) and record_id(record) not in seen
+            ]
+            for record in new_records:
+                seen.add(record_id(record))
+            records.extend(new_records)
+            if isinstance(more, dict) and isinstance(more.get("warnings"), list):
+                warnings.extend(more["warnings"])
+            if finish_reason != "length" and not more_report["truncated"]:
+                complete = True
+                break
+            if not new_records:
+                break
+
+        # 多次输出各自编号，合并后按输出顺序重新编排条目序号
+        self._renumber_records(records, self._get_lesson_id(request_payload.get("lesson_meta"), title))
+
+        if complete:
+            warnings.append(f"AI输出达到长度上限，已分 {attempt + 1} 次输出共 {len(records)} 条记录")
+        else:
+            recovered_keys = report["recovered_record_keys"]
+            warnings.append(
+                f"AI输出被截断，已恢复 {recovered} 条完整记录{'（' + ', '.join(recovered_keys) + '）' if recovered_keys else ''}，"
+                f"继续输出后共 {len(records)} 条，可能仍有遗漏"
+            )
+        result["records"] = records
+        result["warnings"] = warnings
+        return result
 
     def extract_learning_records(self, transcript, lesson_meta=None, options=None):
         """抽取学习记录并返回可直接写入飞书 batch_create 的 payload"""
@@ -190,91 +293,230 @@ class GeminiAgent:
         if not transcript or not str(transcript).strip():
             transcript, markdown_path = self._load_markdown_text()
 
-        lesson_meta = lesson_meta or {}
-        lesson_meta_payload = {
-            "lesson_id": lesson_meta.get("lesson_id") or lesson_meta.get("id") or "HM-UNKNOWN",
-            "source": lesson_meta.get("source") or "course",
-            "link": lesson_meta.get("link") or "",
-            "language": lesson_meta.get("language") or "zh",
-            "timezone": lesson_meta.get("timezone") or "Asia/Shanghai",
-        }
+        lesson_meta_payload = self._build_lesson_meta(lesson_meta)
         options_payload = options or {}
 
         chunks = self._split_transcript(transcript)
-        all_records = []
         warnings = []
-        next_seq = 1
 
         if markdown_path:
             warnings.append(f"使用Markdown输入：{markdown_path}")
 
-        for idx, (chunk_text, start_offset) in enumerate(chunks, start=1):
+        def analyze(idx, chunk_text, start_offset):
             chunk_info = None
             if len(chunks) > 1:
                 chunk_info = {
                     "chunk_id": idx,
                     "chunk_total": len(chunks),
-                    "seq_start": next_seq,
                     "start_offset": start_offset,
                 }
+            return self._analyze_chunk(chunk_text, start_offset, chunk_info, lesson_meta_payload, options_payload)
+
+        # 各分块互不依赖，并发分析；序号在全部返回后按分块顺序统一编排
+        with ThreadPoolExecutor(max_workers=min(self.chunk_concurrency, len(chunks))) as executor:
+            futures = [
+                executor.submit(analyze, idx, chunk_text, start_offset)
+                for idx, (chunk_text, start_offset) in enumerate(chunks, start=1)
+            ]
+            chunk_results = [future.result() for future in futures]
+
+        return self._merge_learning_records(chunk_results, warnings)
+
+    def start_content_stream(self, title="", source_type="article", original_link="", lesson_meta=None, options=None,
+                             check_duplicate=None):
+        """
+        边转录边分析：返回 LearningRecordStream，按顺序 feed() 转录文本，每攒满一个分块就开始分析，
+        不必等整段视频转录完成；finish() 返回与 analyze_content 相同结构的结果。
+        check_duplicate(text) 在提交第一个分块前用已转录的开头查重，返回非空时暂停分析（见 LearningRecordStream.head_duplicate）
+        """
+        def analyze(chunk_text, chunk_info):
+            return self.analyze_content(chunk_text, title, source_type, original_link, lesson_meta, options, chunk=chunk_info)
+
+        def merge(chunks, responses):
+            # 只有一个分块时就是一次普通分析
+            if len(chunks) == 1:
+                return responses[0]
+            return self._combine_chunk_responses(chunks, responses, title, lesson_meta)
+
+        return LearningRecordStream(self, analyze, merge, check_duplicate=check_duplicate)
+
+    def _build_lesson_meta(self, lesson_meta):
+        lesson_meta = lesson_meta or {}
+        return {
+            "lesson_id": lesson_meta.get("lesson_id") or lesson_meta.get("id") or "HM-UNKNOWN",
+            "source": lesson_meta.get("source") or "course",
+            "link": lesson_meta.get("link") or "",
+            "language": lesson_meta.get("language") or "zh",
+            "timezone": lesson_meta.get("timezone") or "Asia/Shanghai",
+        }
 
-            response = self.analyze_content(
-                chunk_text,
-                title=lesson_meta_payload.get("lesson_id", ""),
-                source_type=lesson_meta_payload.get("source", "course"),
-                original_link=lesson_meta_payload.get("link", ""),
-                lesson_meta=lesson_meta_payload,
-                options=options_payload,
-                chunk=chunk_info,
-            )
-            normalized, seq_end = self._normalize_llm_response(
-                response,
-                lesson_meta_payload,
-                options_payload,
-                next_seq,
-                start_offset,
-                len(chunk_text),
-            )
-            all_records.extend(normalized.get("records", []))
-            warnings.extend(normalized.get("warnings", []))
-            next_seq = seq_end
-
-        deduped = {}
-        for record in all_records:
-            record_key = record.get("record_key")
-            if record_key:
-                deduped.setdefault(record_key, record)
-            else:
-                deduped[f"no-key-{len(deduped)+1}"] = record
-
-        sorted_records = sorted(
-            deduped.values(),
-            key=lambda item: item.get("fields", {}).get(self.field_ids["item_seq"], 0),
+    def _analyze_chunk(self, chunk_text, start_offset, chunk_info, lesson_meta, options):
+        """分析单个分块并规范化（序号从 1 开始，合并时统一重排；evidence 偏移量已换算为全文位置）"""
+        response = self.analyze_content(
+            chunk_text,
+            title=lesson_meta.get("lesson_id", ""),
+            source_type=lesson_meta.get("source", "course"),
+            original_link=lesson_meta.get("link", ""),
+            lesson_meta=lesson_meta,
+            options=options,
+            chunk=chunk_info,
         )
+        normalized, _ = self._normalize_llm_response(
+            response,
+            lesson_meta,
+            options,
+            1,
+            start_offset,
+            len(chunk_text),
+        )
+        return normalized
+
+    def _merge_learning_records(self, chunk_results, warnings):
+        """
+        按分块顺序合并，生成飞书 batch_create payload：分块内按 record_key 去重、按条目序号排序，
+        与上一块标题相同的记录视为重叠区域的重复抽取而跳过，再从 1 开始统一编排条目序号，结果与分块完成的先后无关
+        """
+        item_seq_field = self.field_ids["item_seq"]
+        title_field = self.field_ids["title"]
+        records = []
+        previous_titles = set()
+        for normalized in chunk_results:
+            warnings.extend(normalized.get("warnings", []))
+
+            deduped = {}
+            for record in normalized.get("records", []):
+                record_key = record.get("record_key")
+                if record_key:
+                    deduped.setdefault(record_key, record)
+                else:
+                    deduped[f"no-key-{len(deduped)+1}"] = record
+
+            chunk_records = sorted(
+                deduped.values(),
+                key=lambda item: self._seq_sort_key(item.get("fields", {}).get(item_seq_field)),
+            )
+            chunk_titles = set()
+            for record in chunk_records:
+                title = record["fields"].get(title_field)
+                if title and title in previous_titles:
+                    continue
+                if title:
+                    chunk_titles.add(title)
+                record["fields"][item_seq_field] = len(records) + 1
+                records.append({"fields": record["fields"]})
+            previous_titles = chunk_titles
 
         return {
-            "records": [{"fields": record["fields"]} for record in sorted_records],
+            "records": records,
             "warnings": warnings,
         }
 
+    @staticmethod
+    def _seq_sort_key(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 0
+
     def _get_lesson_id(self, lesson_meta, title):
         if lesson_meta and lesson_meta.get("lesson_id"):
             return lesson_meta["lesson_id"]
         return title or "UNKNOWN"
 
-    def _split_transcript(self, transcript, max_chars=28000):
-        if not transcript:
-            return [("", 0)]
-        if len(transcript) <= max_chars:
-            return [(transcript, 0)]
+    def _split_transcript(self, transcript):
+        """按 token 预算在段落/句子/代码块边界分块，返回 [(chunk_text, start_offset)]"""
+        return split_text(transcript, self.chunk_tokens, self.chunk_overlap_tokens, self.model)
 
-        chunks = []
-        start = 0
-        while start < len(transcript):
-            end = start + max_chars
-            chunks.append((transcript[start:end], start))
-            start = end
-        return chunks
+    def _analyze_long_content(self, chunks, title, source_type, original_link, lesson_meta, options):
+        """并发分析各分块，合并后返回与单次分析相同的结构"""
+        def analyze(idx, chunk_text, start_offset):
+            return self.analyze_content(
+                chunk_text,
+                title=title,
+                source_type=source_type,
+                original_link=original_link,
+                lesson_meta=lesson_meta,
+                options=options,
+                chunk={"chunk_id": idx, "chunk_total": len(chunks), "start_offset": start_offset},
+            )
+
+        with ThreadPoolExecutor(max_workers=min(self.chunk_concurrency, len(chunks))) as executor:
+            futures = [
+                executor.submit(analyze, idx, chunk_text, start_offset)
+                for idx, (chunk_text, start_offset) in enumerate(chunks, start=1)
+            ]
+            responses = [future.result() for future in futures]
+        return self._combine_chunk_responses(chunks, responses, title, lesson_meta)
+
+    def _combine_chunk_responses(self, chunks, responses, title, lesson_meta):
+        """按分块顺序拼接各分块的 records（去掉重叠区域的重复记录，evidence 偏移量换算为全文位置），统一编号和统计"""
+        combined = self._get_empty_structure(self._get_lesson_id(lesson_meta, title))
+        combined["warnings"] = [f"内容较长，已分 {len(chunks)} 块分析"]
+        count_by_type = combined["stats"]["count_by_type"]
+        title_field = self.field_ids["title"]
+        failed_chunks = 0
+        previous_titles = set()
+        for chunk_id, ((chunk_text, start_offset), response) in enumerate(zip(chunks, responses), start=1):
+            # 单块失败只记一条说明，其他分块的记录照常保留；全部失败时整体才算分析失败
+            if not self.is_analysis_ok(response):
+                failed_chunks += 1
+                combined["warnings"].append(f"第 {chunk_id} 块分析失败")
+            records = response.get("records") if isinstance(response, dict) else None
+            # 与 _merge_learning_records 相同：分块内按 record_key 去重，与上一块标题相同的记录视为重叠区域的重复抽取
+            record_keys = set()
+            chunk_titles = set()
+            for record in records if isinstance(records, list) else []:
+                if not isinstance(record, dict):
+                    continue
+                record_key = record.get("record_key")
+                if record_key:
+                    if record_key in record_keys:
+                        continue
+                    record_keys.add(record_key)
+                fields = record.get("fields") if isinstance(record.get("fields"), dict) else {}
+                title = fields.get(title_field)
+                if title and title in previous_titles:
+                    continue
+                if title:
+                    chunk_titles.add(title)
+                self._shift_evidence(record.get("evidence"), start_offset, len(chunk_text))
+                learn_type = fields.get(self.field_ids["learn_type"])
+                if learn_type in count_by_type:
+                    count_by_type[learn_type] += 1
+                combined["records"].append(record)
+            previous_titles = chunk_titles
+            if isinstance(response, dict):
+                combined["warnings"].extend(
+                    warning for warning in response.get("warnings", []) if warning != ANALYSIS_FAILED_WARNING
+                )
+        if failed_chunks == len(chunks):
+            combined["warnings"].append(ANALYSIS_FAILED_WARNING)
+        # 各分块各自编号，按分块顺序重新编排，避免 record_key 重复
+        self._renumber_records(combined["records"], combined["lesson_id"])
+        combined["stats"]["count_total"] = len(combined["records"])
+        return combined
+
+    @staticmethod
+    def _shift_evidence(evidence, start_offset, chunk_len):
+        """
+        把 evidence 的分块内偏移量换算为全文位置。end_char 是开区间，等于分块长度时仍是分块内偏移；
+        超出分块长度的视为模型已给出全文位置，保持不变
+        """
+        if not isinstance(evidence, list):
+            return
+        for ev in evidence:
+            if not isinstance(ev, dict):
+                continue
+            for key in ("start_char", "end_char"):
+                if isinstance(ev.get(key), int) and ev[key] <= chunk_len:
+                    ev[key] += start_offset
+
+    def _renumber_records(self, records, lesson_id):
+        for seq, record in enumerate(records, start=1):
+            if not isinstance(record.get("fields"), dict):
+                record["fields"] = {}
+            record["fields"][self.field_ids["item_seq"]] = seq
+            record["record_key"] = f"{lesson_id}-{seq:03d}"
 
     def _load_markdown_text(self, directory=None):
         md_dir = directory or self.markdown_dir
@@ -362,30 +604,19 @@ class GeminiAgent:
                 "confidence": record.get("confidence", 0.0) if isinstance(record, dict) else 0.0,
                 "evidence": record.get("evidence", []) if isinstance(record, dict) else [],
             }
-            evidence_items = normalized_record.get("evidence")
-            if isinstance(evidence_items, list):
-                for ev in evidence_items:
-                    if isinstance(ev, dict):
-                        start_char = ev.get("start_char")
-                        end_char = ev.get("end_char")
-                        if (
-                            isinstance(start_char, int)
-                            and chunk_len
-                            and start_char < chunk_len
-                        ):
-                            ev["start_char"] = start_char + chunk_start_offset
-                        if (
-                            isinstance(end_char, int)
-                            and chunk_len
-                            and end_char < chunk_len
-                        ):
-                            ev["end_char"] = end_char + chunk_start_offset
+            if chunk_len:
+                self._shift_evidence(normalized_record["evidence"], chunk_start_offset, chunk_len)
 
             normalized["records"].append(normalized_record)
 
         normalized["warnings"].extend(response.get("warnings", []) if isinstance(response, dict) else [])
         return normalized, seq
 
+    @staticmethod
+    def is_analysis_ok(result):
+        """analyze_content 的结果是否为成功的分析（失败时返回的是带“AI分析失败”警告的空结构）"""
+        return isinstance(result, dict) and ANALYSIS_FAILED_WARNING not in (result.get("warnings") or [])
+
     def _get_empty_structure(self, lesson_id):
         """返回空的安全结构，防止程序崩溃"""
         return {
@@ -401,5 +632,95 @@ class GeminiAgent:
                     "资源": 0,
                 },
             },
-            "warnings": ["AI分析失败"],
+            "warnings": [ANALYSIS_FAILED_WARNING],
         }
+
+
+class LearningRecordStream:
+    """
+    边转录边分析：feed() 按顺序送入转录文本，攒满一个分块（token 预算）就提交到后台线程分析，
+    finish() 提交剩余文本、等待所有分块完成后按分块顺序合并；cancel() 放弃尚未开始的分块。
+    转录完成前只能在第一个分块提交前查重（check_duplicate），之后发现的重复只能取消排队中的分块。
+    开头相似不代表全文重复（频道片头、赞助口播），命中后只暂停提交、继续累积文本：调用方用全文确认重复时 cancel()，
+    否则 finish() 分析完整文本。
+    analyze(chunk_text, chunk_info) 分析单个分块，merge(chunks, responses) 合并结果
+    """
+
+    def __init__(self, agent, analyze, merge, separator="\n\n", check_duplicate=None):
+        self.agent = agent
+        self.analyze = analyze
+        self.merge = merge
+        # 转录尚未完成时提交第一个分块前先查重，开头疑似重复时暂不产生分析请求
+        self.check_duplicate = check_duplicate
+        self.head_duplicate = None
+        # 与 MediaHandler.process_link 拼接全文的方式一致，保证 evidence 偏移量对应最终转录全文
+        self.separator = separator
+
+        self.buffer = ""
+        self.buffer_offset = 0
+        self.received = 0
+        self.chunks = []
+        self.finished = False
+
+        self.executor = ThreadPoolExecutor(max_workers=agent.chunk_concurrency)
+        self.futures = []
+
+    def feed(self, text):
+        if not text:
+            return
+        if self.received:
+            text = self.separator + text
+        self.received += len(text)
+        self.buffer += text
+        if self.head_duplicate:
+            # 开头疑似重复：只累积文本，等全文查重后再决定 finish() 还是 cancel()
+            return
+        chunks = self.agent._split_transcript(self.buffer)
+        if len(chunks) == 1:
+            return
+        if not self.chunks and self.check_duplicate:
+            self.head_duplicate = self.check_duplicate(self.buffer)
+            if self.head_duplicate:
+                return
+        # 最后一块可能还没装满，留在缓冲区继续累积（与前一块的重叠部分一起保留）
+        for chunk_text, start_offset in chunks[:-1]:
+            self._submit(chunk_text, self.buffer_offset + start_offset)
+        last_offset = chunks[-1][1]
+        self.buffer = self.buffer[last_offset:]
+        self.buffer_offset += last_offset
+
+    def _submit(self, chunk_text, start_offset, chunk_total=None):
+        self.chunks.append((chunk_text, start_offset))
+        chunk_id = len(self.chunks)
+
+        # 只有一个分块时不附带分块信息；总数只有 finish() 提交剩余分块时才知道
+        chunk_info = None
+        if chunk_total != 1:
+            chunk_info = {"chunk_id": chunk_id, "start_offset": start_offset}
+            if chunk_total:
+                chunk_info["chunk_total"] = chunk_total
+        if not self.finished:
+            print(f"   🧠 分块 {chunk_id} 已就绪（{len(chunk_text)} 字符），开始后台分析...")
+
+        self.futures.append(self.executor.submit(self.analyze, chunk_text, chunk_info))
+
+    def finish(self):
+        """提交剩余文本并等待全部分块分析完成，返回合并后的结果"""
+        self.finished = True
+        if self.buffer or not self.chunks:
+            # 通常只剩最后一块；开头疑似重复而暂停时缓冲区是整段文本，需要重新分块
+            remaining = self.agent._split_transcript(self.buffer)
+            chunk_total = len(self.chunks) + len(remaining)
+            for chunk_text, start_offset in remaining:
+                self._submit(chunk_text, self.buffer_offset + start_offset, chunk_total)
+            self.buffer = ""
+        try:
+            responses = [future.result() for future in self.futures]
+        finally:
+            self.executor.shutdown()
+        return self.merge(self.chunks, responses)
+
+    def cancel(self):
+        """不再需要结果（转录失败或内容重复）：取消排队中的分块，不等待正在分析的分块"""
+        self.finished = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
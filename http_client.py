@@ -0,0 +1,49 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli  # noqa: F401  urllib3 装了 brotli 才能解码 br
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+
+class PooledSession(requests.Session):
+    """带连接池和默认超时的 Session：同一域名复用 TCP+TLS 连接"""
+
+    def __init__(self, pool_connections=None, pool_maxsize=None, timeout=None):
+        super().__init__()
+        # 缓存的域名连接池数量 / 每个域名的最大连接数
+        pool_connections = pool_connections or int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+        pool_maxsize = pool_maxsize or int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+        self.default_timeout = timeout or float(os.getenv("HTTP_DEFAULT_TIMEOUT", "30"))
+
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        self.headers["Accept-Encoding"] = ACCEPT_ENCODING
+
+    def request(self, method, url, **kwargs):
+        # 未显式指定超时的调用（例如多数飞书接口）使用默认超时，避免无限挂起
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.default_timeout
+        return super().request(method, url, **kwargs)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """进程内共享的 HTTP Session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = PooledSession()
+        return _session
@@ -8,10 +8,13 @@ import os
 import json
 import time
 import uuid
-import requests
 from datetime import datetime
 from dotenv import load_dotenv
 from zhipuai import ZhipuAI
+from llm_cache import cached_chat_completion
+from llm_json import parse_cached_reply
+from text_chunker import estimate_tokens, input_token_budget, truncate_to_tokens
+from http_client import get_session
 
 load_dotenv()
 
@@ -19,6 +22,7 @@ class InterviewAnalysisSystem:
     """面试题目AI分析 + 飞书推送一体化系统"""
 
     def __init__(self):
+        self.session = get_session()
         # 飞书配置
         self.app_id = os.getenv("INTERVIEW_APP_ID")
         self.app_secret = os.getenv("INTERVIEW_APP_SECRET")
@@ -48,7 +52,7 @@ class InterviewAnalysisSystem:
 
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -76,7 +80,7 @@ class InterviewAnalysisSystem:
         }
 
         try:
-            resp = requests.get(url, headers=headers)
+            resp = self.session.get(url, headers=headers)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get("code") == 0:
@@ -124,7 +128,7 @@ class InterviewAnalysisSystem:
 
         try:
             print(f"🔍 发送的数据结构: {json.dumps(record_data, ensure_ascii=False, indent=2)[:1000]}...")
-            resp = requests.post(url, headers=headers, params=params, json=record_data)
+            resp = self.session.post(url, headers=headers, params=params, json=record_data)
 
             if resp.status_code == 200:
                 data = resp.json()
@@ -151,8 +155,12 @@ class InterviewAnalysisSystem:
         if not self.client:
             return self._get_empty_structure()
 
-        # 截断过长文本
-        question_text = question_text[:8000]
+        # 超过模型上下文预算时在句子边界截断并提示
+        question_text, truncated = truncate_to_tokens(
+            question_text, input_token_budget(self.model, 4000), self.model
+        )
+        if truncated:
+            print(f"⚠️ 题目内容过长，已截断到约 {estimate_tokens(question_text, self.model)} tokens")
 
         # 构建面试分析的专门 prompt
         prompt = f"""
@@ -202,7 +210,8 @@ class InterviewAnalysisSystem:
 """
 
         try:
-            response = self.client.chat.completions.create(
+            response = cached_chat_completion(
+                self.client,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "你是一位专业的互联网产品战略专家，擅长深度分析商业案例和面试题目。"},
@@ -212,30 +221,24 @@ class InterviewAnalysisSystem:
                 max_tokens=4000
             )
 
-            if response and response.choices:
-                content = response.choices[0].message.content.strip()
-
-                # 清理可能的markdown标记
-                content = content.replace('```json', '').replace('```', '').strip()
+            if response["content"]:
+                content = response["content"]
 
                 try:
-                    # 清理可能的格式问题
-                    content = content.replace(',\\n    }', '\\n    }')  # 移除最后一个逗号
-                    result = json.loads(content)
+                    # 修复多余逗号、代码块外壳等格式问题；输出被截断时保留已完整的部分，缺失的部分用空结构补齐
+                    result, report = parse_cached_reply(
+                        response, records_key=None, empty_structure=self._get_empty_structure()
+                    )
+                    if report["truncated"]:
+                        print("🩹 AI 输出被截断，已保留完整的部分")
+                    elif report["repaired"]:
+                        print("✅ 修复后解析成功")
                     print("✅ 面试题目分析完成")
                     return result
-                except json.JSONDecodeError as e:
+                except ValueError as e:
                     print(f"❌ JSON解析失败: {e}")
-                    # 尝试提取原始内容中的有用信息
-                    try:
-                        # 简单的修复策略
-                        content = content.replace(',\\n    }', '\\n    }').replace(',\\n}', '\\n}')
-                        result = json.loads(content)
-                        print("✅ 修复后解析成功")
-                        return result
-                    except:
-                        print(f"原始内容: {content[:1000]}...")
-                        return self._get_fallback_structure(content)
+                    print(f"原始内容: {content[:1000]}...")
+                    return self._get_fallback_structure(content)
 
             return self._get_empty_structure()
 
@@ -0,0 +1,220 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# 接口限流时所有请求线程一起等待的秒数
+RATE_LIMIT_PAUSE_SECONDS = 30
+
+LLM_CACHE_DB_FILE = "llm_cache.db"
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(model, messages, temperature=None, max_tokens=None):
+    """缓存键：模型 + 温度 + max_tokens + 系统提示词 + 用户提示词哈希"""
+    system_prompt = "\n".join(m["content"] for m in messages if m.get("role") == "system")
+    other_messages = [[m.get("role"), m.get("content")] for m in messages if m.get("role") != "system"]
+    payload = json.dumps({
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "system": system_prompt,
+        "prompt_sha256": _sha256(json.dumps(other_messages, ensure_ascii=False)),
+    }, ensure_ascii=False, sort_keys=True)
+    return _sha256(payload)
+
+
+class LLMCache:
+    """大模型响应缓存（SQLite）：相同输入直接复用上次的回复，带 TTL 与容量上限（按最近访问时间淘汰）"""
+
+    def __init__(self, db_path=None, ttl=None, max_bytes=None):
+        self.db_path = db_path or os.getenv("LLM_CACHE_DB_FILE", LLM_CACHE_DB_FILE)
+        self.ttl = ttl or float(os.getenv("LLM_CACHE_TTL_DAYS", "30")) * 86400
+        self.max_bytes = max_bytes or int(float(os.getenv("LLM_CACHE_MAX_MB", "200")) * 1024 * 1024)
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() != "false"
+        # 跳过读取（强制重新请求），新结果仍然写入缓存
+        self.bypass = os.getenv("LLM_CACHE_BYPASS", "false").lower() == "true"
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = None  # 首次写入时统计
+
+        self.conn = None
+        if self.enabled:
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self._init_schema()
+            atexit.register(self.close)
+
+    def _init_schema(self):
+        with self.lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    cache_key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    finish_reason TEXT,
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_llm_responses_accessed ON llm_responses (accessed_at);
+            """)
+            self.conn.commit()
+
+    def get(self, cache_key):
+        """命中且未过期时返回 {'content', 'finish_reason', 'usage'}，否则返回 None"""
+        if not self.enabled or self.bypass:
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content, finish_reason, prompt_tokens, completion_tokens, created_at FROM llm_responses WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+            if not row or now - row[4] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE cache_key = ?", (now, cache_key))
+            self.conn.commit()
+        return {
+            "content": row[0],
+            "finish_reason": row[1],
+            "usage": {"prompt_tokens": row[2], "completion_tokens": row[3]},
+        }
+
+    def put(self, cache_key, model, content, finish_reason=None, usage=None):
+        if not self.enabled or not content:
+            return
+        usage = usage or {}
+        size = len(content.encode("utf-8"))
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM llm_responses WHERE cache_key = ?", (cache_key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (cache_key, model, content, finish_reason, prompt_tokens, completion_tokens, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, model, content, finish_reason, usage.get("prompt_tokens"), usage.get("completion_tokens"), size, now, now),
+            )
+            if self.total_bytes is None:
+                self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+            else:
+                self.total_bytes += size - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict(now)
+            self.conn.commit()
+
+    def invalidate(self, cache_key):
+        """删除一条缓存（调用方无法使用该回复时，下次重新请求）"""
+        if not self.enabled:
+            return
+        with self.lock:
+            row = self.conn.execute("SELECT size FROM llm_responses WHERE cache_key = ?", (cache_key,)).fetchone()
+            if not row:
+                return
+            self.conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (cache_key,))
+            if self.total_bytes is not None:
+                self.total_bytes -= row[0]
+            self.conn.commit()
+
+    def _evict(self, now):
+        """先删过期条目，再按最近访问时间淘汰，直到低于容量上限的 90%"""
+        self.conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl,))
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT cache_key, size FROM llm_responses ORDER BY accessed_at").fetchall()
+        evicted = []
+        for cache_key, size in rows:
+            if self.total_bytes <= target:
+                break
+            evicted.append((cache_key,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM llm_responses WHERE cache_key = ?", evicted)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self.lock:
+            if self.conn is None:
+                return
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+        if self.hits or self.misses:
+            print(f"💾 LLM 缓存: 命中 {self.hits} 次，未命中 {self.misses} 次")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """进程内共享的默认响应缓存"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
+
+
+def _is_rate_limited(error):
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message or "1302" in message or "并发" in message or "频率" in message
+
+
+def cached_chat_completion(client, model, messages, temperature=None, max_tokens=None, cache=None,
+                           rate_limiter=None, retries=2):
+    """
+    带缓存的 chat.completions.create：返回 {'content', 'finish_reason', 'usage', 'cached', 'cache_key'}。
+    只缓存完整的回复（达到 max_tokens 被截断的不缓存）；调用方解析失败时应调用 invalidate(cache_key) 删除；
+    提供 rate_limiter 时未命中的请求先取令牌，接口限流则所有线程暂停后重试；其他接口异常照常抛出，由调用方处理
+    """
+    cache = cache or get_llm_cache()
+    cache_key = make_cache_key(model, messages, temperature, max_tokens)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        print("   💾 命中 LLM 缓存，跳过请求")
+        cached["cached"] = True
+        cached["cache_key"] = cache_key
+        return cached
+
+    kwargs = {"model": model, "messages": messages}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    if max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+    for attempt in range(retries + 1):
+        if rate_limiter:
+            rate_limiter.acquire()
+        try:
+            response = client.chat.completions.create(**kwargs)
+            break
+        except Exception as e:
+            if not rate_limiter or attempt >= retries or not _is_rate_limited(e):
+                raise
+            print(f"   ⏳ 智谱AI 接口限流，等待 {RATE_LIMIT_PAUSE_SECONDS} 秒后重试...")
+            rate_limiter.pause(RATE_LIMIT_PAUSE_SECONDS)
+
+    if not response or not response.choices:
+        return {"content": "", "finish_reason": None, "usage": {}, "cached": False, "cache_key": cache_key}
+    choice = response.choices[0]
+    content = (choice.message.content or "").strip()
+    finish_reason = getattr(choice, "finish_reason", None)
+    usage = getattr(response, "usage", None)
+    usage = {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+    }
+    if finish_reason != "length":
+        cache.put(cache_key, model, content, finish_reason, usage)
+    return {"content": content, "finish_reason": finish_reason, "usage": usage, "cached": False, "cache_key": cache_key}
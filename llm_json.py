@@ -0,0 +1,176 @@
+import json
+import re
+
+from llm_cache import get_llm_cache
+
+# 字符串里未转义的控制字符（模型常把换行直接写进字符串）
+CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+# 包住整段回复的 markdown 代码块外壳：只认开头和结尾的 ```（被截断时没有结尾），字符串里的 ``` 不受影响
+CODE_FENCE = re.compile(r"\A```(?:json|JSON)?[ \t]*\n(.*?)(?:\n```[ \t]*)?\Z", re.S)
+
+
+def _extract_json_text(content):
+    """去掉包住整段回复的 markdown 代码块外壳和前面的说明文字，从第一个 { 或 [ 开始"""
+    content = (content or "").strip()
+    match = CODE_FENCE.match(content)
+    if match and match.group(1).strip():
+        content = match.group(1).strip()
+    starts = [index for index in (content.find("{"), content.find("[")) if index >= 0]
+    return content[min(starts):] if starts else content
+
+
+def _strip_trailing_comma(out):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _scan(text):
+    """
+    逐字符扫描（区分字符串内外）：去掉 } ] 前多余的逗号、转义字符串里的换行/制表符，
+    顶层值结束后忽略后面的内容。返回 (修复后的文本, 未闭合的括号栈, 可截断位置)；
+    可截断位置是每个完整值之后的 (文本长度, 当时的括号栈)，用于补全被截断的输出
+    """
+    out = []
+    stack = []
+    safe_points = []
+    in_string = False
+    escape = False
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            elif ch in CONTROL_ESCAPES:
+                out.append(CONTROL_ESCAPES[ch])
+                continue
+            out.append(ch)
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            _strip_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(ch)
+            safe_points.append((len(out), list(stack)))
+            if not stack:
+                break
+            continue
+        elif ch == "," and stack:
+            safe_points.append((len(out), list(stack)))
+        out.append(ch)
+    return "".join(out), stack, safe_points
+
+
+def _close_truncated(text, safe_points):
+    """截到最后一个完整值之后并补齐括号，丢弃写了一半的值"""
+    for position, stack in reversed(safe_points):
+        candidate = text[:position].rstrip()
+        if candidate.endswith(","):
+            candidate = candidate[:-1]
+        candidate += "".join(reversed(stack))
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+def _salvage_array(text, key):
+    """从被截断的输出中逐个解析 key 对应数组里的完整元素，写了一半的元素丢弃"""
+    match = re.search(r'"%s"\s*:\s*\[' % re.escape(key), text)
+    if not match:
+        return None
+    decoder = json.JSONDecoder()
+    position = match.end()
+    items = []
+    while True:
+        while position < len(text) and (text[position].isspace() or text[position] == ","):
+            position += 1
+        if position >= len(text) or text[position] == "]":
+            break
+        try:
+            item, position = decoder.raw_decode(text, position)
+        except ValueError:
+            break
+        items.append(item)
+    return items
+
+
+def parse_llm_json(content, records_key="records"):
+    """
+    解析大模型返回的 JSON，尽量不丢弃已付费的输出：
+    1) 直接解析（去掉代码块外壳后再试一次）；2) 修复多余逗号、字符串中的裸换行后解析；
+    3) 输出被截断时补齐括号，并从 records_key 数组中挑出完整的记录。
+    返回 (data, report)，report 包含 repaired / truncated / recovered_records / recovered_record_keys；
+    完全无法解析时抛出 ValueError
+    """
+    report = {"repaired": False, "truncated": False, "recovered_records": None, "recovered_record_keys": []}
+    try:
+        return json.loads((content or "").strip()), report
+    except ValueError:
+        pass
+    text = _extract_json_text(content)
+    try:
+        return json.loads(text), report
+    except ValueError:
+        pass
+
+    report["repaired"] = True
+    repaired, stack, safe_points = _scan(text)
+    if not stack:
+        try:
+            return json.loads(repaired), report
+        except ValueError as e:
+            raise ValueError(f"无法解析AI返回的JSON: {e}")
+
+    report["truncated"] = True
+    data = _close_truncated(repaired, safe_points)
+    records = _salvage_array(repaired, records_key) if records_key else None
+    if records is not None:
+        if not isinstance(data, dict):
+            data = {}
+        data[records_key] = records
+        report["recovered_records"] = len(records)
+        report["recovered_record_keys"] = [
+            record.get("record_key") for record in records if isinstance(record, dict) and record.get("record_key")
+        ]
+    if data is None:
+        raise ValueError("AI返回的JSON被截断且无法恢复")
+    return data, report
+
+
+def fill_structure(result, empty_structure):
+    """把被截断后保留下来的部分合并进空结构，缺失的字段保持默认值，保证后续按字段读取不出错"""
+    for key, value in result.items():
+        if isinstance(value, dict) and isinstance(empty_structure.get(key), dict):
+            empty_structure[key].update(value)
+        else:
+            empty_structure[key] = value
+    return empty_structure
+
+
+def parse_cached_reply(response, records_key="records", empty_structure=None):
+    """
+    解析 cached_chat_completion 返回的回复（见 parse_llm_json）。被截断或无法解析的回复从缓存删除，下次重新请求；
+    传入 empty_structure 时，被截断的结果合并进该结构（见 fill_structure）。
+    返回 (data, report)；完全无法解析时抛出 ValueError
+    """
+    try:
+        result, report = parse_llm_json(response["content"], records_key=records_key)
+    except ValueError:
+        get_llm_cache().invalidate(response["cache_key"])
+        raise
+    if report["truncated"]:
+        get_llm_cache().invalidate(response["cache_key"])
+        if empty_structure is not None and isinstance(result, dict):
+            result = fill_structure(result, empty_structure)
+    return result, report
@@ -1,7 +1,8 @@
 # main.py
 import time
 import os
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime
 from dotenv import load_dotenv
 
 # 引入模块
@@ -9,6 +10,9 @@ from wewe_handler import WeWeHandler
 from gemini_agent import GeminiAgent
 from obsidian_pusher import ObsidianPusher
 from feishu_pusher import FeishuPusher
+from scheduler import PollScheduler
+from state_store import WEWE_SOURCE
+from dedup_index import DedupIndex
 
 load_dotenv()
 
@@ -19,11 +23,14 @@ class AutomationSystem:
         self.obsidian = ObsidianPusher()
         self.feishu = FeishuPusher()
 
-        # 状态记录
-        self.last_wewe_check = datetime.min
-        self.wewe_check_interval = timedelta(hours=4) # 4小时检查一次
+        # 按发布频率自适应安排下次检查时间（状态保存在 state.db）
+        self.scheduler = PollScheduler()
+        # 近重复内容指纹索引：多个公众号转发的同一篇内容只分析一次
+        self.dedup = DedupIndex()
 
         self.test_mode = os.getenv("TEST_MODE", "false").lower() == "true"
+        # 单篇分析之间的间隔（秒），避免 AI 接口限流
+        self.analysis_interval = float(os.getenv("WEWE_ANALYSIS_INTERVAL", "3"))
 
     def run_wewe_cycle(self):
         """执行微信公众号的处理流程"""
@@ -32,6 +39,14 @@ class AutomationSystem:
         # 1. 获取新文章列表
         new_articles = self.wewe.fetch_article_list()
 
+        # 拉取失败不算空轮询（否则一次短暂故障就会让检查间隔翻倍），稍后按最小间隔重试
+        if self.wewe.fetch_error:
+            self.scheduler.record_error(WEWE_SOURCE)
+            return
+
+        # 只按首次出现的文章估算发布频率，重试、测试模式剩下的旧文章不算新发布
+        self.scheduler.record_poll(WEWE_SOURCE, self.wewe.first_seen_count)
+
         if not new_articles:
             print("   没有发现新文章。")
             return
@@ -45,33 +60,41 @@ class AutomationSystem:
         else:
             articles_to_process = new_articles
 
-        # 处理选定的文章
-        for article in articles_to_process:
-            self.process_single_article(article)
+        # 并发抓取正文，哪篇先下载完就先分析哪篇
+        for article, content in self.wewe.iter_article_contents(articles_to_process):
+            self.process_single_article(article, content)
 
-        # 更新检查时间
-        self.last_wewe_check = datetime.now()
         print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ WeWe RSS 周期执行完毕。")
 
-    def process_single_article(self, article):
-        """处理单篇文章的核心逻辑"""
+    def process_single_article(self, article, content):
+        """处理单篇文章的核心逻辑（content 为已抓取的正文）"""
         title = article['title']
         url = article['url']
         date = article['date']
 
         print(f"      📄 处理: {title[:30]}...")
 
-        # 1. 获取内容
-        content = self.wewe.get_article_content(url)
+        # 1. 检查内容
         if not content:
-            print("      ❌ 内容获取失败，跳过")
+            if self.wewe.record_fetch_failure(url, title):
+                print(f"      ❌ 内容获取失败，已连续失败 {self.wewe.max_fetch_failures} 次，不再重试")
+            else:
+                print("      ❌ 内容获取失败，跳过（下次重试）")
+            return
+
+        # 2. 近重复检测：已分析过的内容只登记关联，不再调用 AI 和推送
+        duplicate = self.dedup.find_duplicate(content)
+        if duplicate:
+            print(f"      ♻️ 与已处理内容重复（{duplicate['title'][:30]}，距离 {duplicate['distance']}），跳过分析")
+            self.dedup.add(content, WEWE_SOURCE, url, title, duplicate_of=duplicate['id'])
+            self.wewe.mark_processed(url, title)
             return
 
-        # 2. Gemini 分析
+        # 3. Gemini 分析
         print("      🧠 正在进行 AI 分析...")
         analysis_json = self.gemini.analyze_content(content, title, source_type="微信公众号", original_link=url)
 
-        # 3. 推送飞书
+        # 4. 推送飞书
         try:
             # 构造兼容的raw_data字典
             raw_data = {
@@ -86,37 +109,41 @@ class AutomationSystem:
         except Exception as e:
             print(f"      ❌ 飞书推送失败: {e}")
 
-        # 4. 推送 Obsidian
+        # 5. 推送 Obsidian
         obsidian_success = self.obsidian.push_article(title, content, url, date, analysis_json)
 
-        # 5. 标记为已处理 (只有在至少一个推送成功或尝试后才标记，避免死循环)
-        self.wewe.mark_processed(url)
+        # 6. 标记为已处理 (只有在至少一个推送成功或尝试后才标记，避免死循环)
+        self.wewe.mark_processed(url, title)
 
-        # 避免 Gemini 限流，单篇之间小歇一下
-        time.sleep(3)
+        # 7. 分析成功才登记指纹，失败的分析不能成为后续副本的“原文”
+        if self.gemini.is_analysis_ok(analysis_json):
+            self.dedup.add(content, WEWE_SOURCE, url, title)
+
+        # 避免 Gemini 限流，单篇之间小歇一下（正文抓取在后台继续进行）
+        time.sleep(self.analysis_interval)
+
+    def run_due_sources(self):
+        """只运行已到期的源（适合 cron / GitHub Actions 单次调用）"""
+        if self.scheduler.is_due(WEWE_SOURCE):
+            self.run_wewe_cycle()
+        else:
+            minutes_left = self.scheduler.seconds_until_due([WEWE_SOURCE]) // 60
+            print(f"⏳ WeWe RSS 未到检查时间，约 {int(minutes_left)} 分钟后")
 
     def run(self):
         """主循环"""
         print("🚀 系统启动 (按 Ctrl+C 停止)")
-        print(f"   配置: 每 {self.wewe_check_interval} 检查一次 WeWe RSS")
+        print(f"   配置: 按发布频率自适应检查 WeWe RSS "
+              f"({self.scheduler.min_interval / 60:.0f} 分钟 ~ {self.scheduler.max_interval / 3600:.0f} 小时)")
 
         try:
             while True:
-                now = datetime.now()
-
-                # 检查是否满足 4 小时间隔
-                if now - self.last_wewe_check > self.wewe_check_interval:
+                if self.scheduler.is_due(WEWE_SOURCE):
                     self.run_wewe_cycle()
-                else:
-                    # 计算下次运行时间
-                    next_run = self.last_wewe_check + self.wewe_check_interval
-                    minutes_left = (next_run - now).seconds // 60
-                    # 打印心跳日志（可选）
-                    # print(f"⏳ 待机中... 下次 WeWe 更新约在 {minutes_left} 分钟后")
 
-                # 主循环休眠，避免 CPU 占用过高
-                # 建议每分钟检查一次时间
-                time.sleep(60)
+                # 休眠到下一个源到期（最多 60 秒检查一次）
+                wait_seconds = self.scheduler.seconds_until_due([WEWE_SOURCE])
+                time.sleep(max(1, min(60, wait_seconds)))
 
         except KeyboardInterrupt:
             print("\n🛑 系统已停止")
@@ -127,5 +154,7 @@ if __name__ == "__main__":
     if os.getenv("TEST_MODE") == "true":
         print("⚠️ 测试模式：立即运行一次")
         system.run_wewe_cycle()
+    elif "--once" in sys.argv:
+        system.run_due_sources()
     else:
         system.run()
\ No newline at end of file
@@ -1,42 +1,202 @@
 import yt_dlp
+import csv
+import html
+import json
 import os
 import re
+import shutil
 import subprocess
+import sys
+import tempfile
 import time
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
 from groq import Groq
 from dotenv import load_dotenv
+from rate_limiter import get_rate_limiter
+from transcript_store import TranscriptStore, hash_file, parse_video_key
 
 load_dotenv()
 
 TEMP_AUDIO_FILE = "temp_audio"
+MEDIA_JOBS_DIR = "media_jobs"
+JOB_MANIFEST_FILE = "manifest.json"
+
+# 流式模式的编码参数：16kHz 单声道 64kbps CBR MP3 (MPEG-2 Layer III)
+# 每帧 576 个采样 = 36ms，帧长固定 72 * 64000 / 16000 = 288 字节（该组合不需要填充位）
+STREAM_SAMPLE_RATE = 16000
+STREAM_BITRATE = 64000
+MP3_FRAME_SAMPLES = 576
+MP3_FRAME_BYTES = 72 * STREAM_BITRATE // STREAM_SAMPLE_RATE
+# 关闭单段时长上限（MEDIA_SEGMENT_SECONDS=0）时流式模式的切块时长
+STREAM_CHUNK_SECONDS = 300
+
+# 音频编码方案：下载原始音轨后由 encode_audio 用 encoder/quality/args 重新编码
+# 语音识别只需要 16kHz 单声道：opus_16k 每小时约 11MB，原来的 mp3_64k 约 28MB
+AUDIO_PROFILES = {
+    'mp3_64k': {'encoder': 'libmp3lame', 'ext': 'mp3', 'quality': '64', 'fallback_quality': '32', 'args': []},
+    'opus_16k': {'encoder': 'libopus', 'ext': 'opus', 'quality': '24', 'fallback_quality': '16',
+                 # 受约束 VBR：码率贴近目标值，便于按大小上限估算片段时长
+                 'args': ['-ac', '1', '-ar', '16000', '-application', 'voip', '-vbr', 'constrained']},
+    'flac_16k': {'encoder': 'flac', 'ext': 'flac', 'quality': None, 'fallback_quality': None,
+                 'args': ['-ac', '1', '-ar', '16000', '-sample_fmt', 's16']},
+}
+
+
+def profile_ffmpeg_args(profile, quality=None):
+    """编码方案对应的 ffmpeg 输出参数"""
+    quality = quality or profile['quality']
+    args = ['-vn', '-c:a', profile['encoder']]
+    if quality:
+        args += ['-b:a', f"{quality}k"]
+    return args + profile['args']
+
+
+# 停顿检测：低于该音量 (dB) 且持续超过该时长 (秒) 视为停顿
+SILENCE_NOISE_DB = -35
+SILENCE_MIN_SECONDS = 0.4
+# 复用分段转录时起止时间允许的误差（秒）
+SEGMENT_MATCH_TOLERANCE = 0.05
+
+# 按链接域名区分下载器，各自限制并发下载数（避免同一站点并发过高触发风控）
+EXTRACTOR_DOMAINS = {
+    'youtube': ('youtube.com', 'youtu.be'),
+    'bilibili': ('bilibili.com', 'b23.tv'),
+}
+
+_download_slots = {}
+_download_slots_lock = threading.Lock()
+
+
+def get_extractor(url):
+    host = urlsplit(url).netloc.lower()
+    for extractor, domains in EXTRACTOR_DOMAINS.items():
+        if any(host == domain or host.endswith("." + domain) for domain in domains):
+            return extractor
+    return 'generic'
+
+
+def _get_download_slot(extractor):
+    """进程内共享的下载并发限制：MEDIA_DOWNLOAD_CONCURRENCY_<EXTRACTOR>，默认 MEDIA_DOWNLOAD_CONCURRENCY"""
+    with _download_slots_lock:
+        if extractor not in _download_slots:
+            default = os.getenv("MEDIA_DOWNLOAD_CONCURRENCY", "2")
+            limit = int(os.getenv(f"MEDIA_DOWNLOAD_CONCURRENCY_{extractor.upper()}", default))
+            _download_slots[extractor] = threading.Semaphore(max(1, limit))
+        return _download_slots[extractor]
+
+
+# 字幕格式优先级（越靠前越好解析）
+SUBTITLE_FORMATS = ('json3', 'vtt', 'srt', 'json')
+
+
+def subtitle_to_text(data, ext):
+    """把字幕文件转换为纯文本：去掉时间轴、样式标签和自动字幕中滚动重复的行"""
+    lines = []
+    if ext in ('json3', 'json'):
+        payload = json.loads(data)
+        if 'events' in payload:
+            # YouTube json3: events[].segs[].utf8
+            for event in payload['events']:
+                text = ''.join(seg.get('utf8', '') for seg in event.get('segs') or [])
+                lines.extend(text.split('\n'))
+        else:
+            # Bilibili: body[].content
+            lines = [item.get('content', '') for item in payload.get('body', [])]
+    else:
+        for line in data.splitlines():
+            line = line.strip()
+            if (not line or line.isdigit() or '-->' in line or line.startswith(('WEBVTT', 'NOTE', 'Kind:', 'Language:'))):
+                continue
+            lines.append(html.unescape(re.sub(r'<[^>]+>', '', line)))
+
+    text_lines = []
+    for line in (line.strip() for line in lines):
+        if line and (not text_lines or text_lines[-1] != line):
+            text_lines.append(line)
+    return '\n'.join(text_lines)
+
+
+@contextmanager
+def job_workspace():
+    """单个任务独立的临时目录，结束时（包括异常）整体删除"""
+    workspace = tempfile.mkdtemp(prefix="media_job_", dir=os.getenv("MEDIA_WORK_DIR") or None)
+    try:
+        yield workspace
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
 
 class MediaHandler:
     def __init__(self):
         self.groq_key = os.getenv("GROQ_API_KEY")
         self.client = Groq(api_key=self.groq_key) if self.groq_key else None
-        self.download_lock = threading.Lock()  # 排队锁，确保同时只有一个下载任务
-
-    def download_audio(self, url):
+        # 转录结果缓存（按视频 ID，含分段结果），失败重跑时不必重新下载和转录
+        self.transcripts = TranscriptStore()
+
+        # 优先使用视频已有的字幕（人工字幕优先，其次自动字幕），没有字幕时才下载音频转录
+        self.prefer_subtitles = os.getenv("MEDIA_PREFER_SUBTITLES", "true").lower() != "false"
+        self.subtitle_langs = [lang.strip() for lang in os.getenv("MEDIA_SUBTITLE_LANGS", "zh-Hans,zh-CN,zh,zh-Hant,zh-TW,en").split(",") if lang.strip()]
+
+        # 断点续传：音频、分段边界保存在 media_jobs/<任务 ID>，中断后下次从未完成的片段继续
+        self.checkpoints = os.getenv("MEDIA_CHECKPOINTS", "true").lower() != "false"
+        self.jobs_dir = os.getenv("MEDIA_JOBS_DIR", MEDIA_JOBS_DIR)
+        self.job_ttl = float(os.getenv("MEDIA_JOB_TTL_HOURS", "72")) * 3600
+        if self.checkpoints:
+            self._cleanup_stale_jobs()
+
+        # 流式模式：yt-dlp 管道输出给 ffmpeg，按固定时长切块后直接转录，不落盘
+        self.streaming = os.getenv("MEDIA_STREAMING", "false").lower() == "true"
+
+        # 音频编码方案（见 AUDIO_PROFILES）
+        profile_name = os.getenv("MEDIA_AUDIO_PROFILE", "opus_16k")
+        if profile_name not in AUDIO_PROFILES:
+            print(f"⚠️ 未知的 MEDIA_AUDIO_PROFILE={profile_name}，使用 opus_16k")
+            profile_name = "opus_16k"
+        self.audio_profile = AUDIO_PROFILES[profile_name]
+
+        # 分割方式：silence = 在停顿处切分；fixed = 等长切分。两种方式的片段时长都按文件大小上限自动计算，
+        # 再受 MEDIA_SEGMENT_SECONDS 限制（默认 600 秒）。opus_16k 约 11MB/小时，只按大小上限切分时两小时以内的视频
+        # 只有一段，分段并发转录、逐段续传和边转录边分析都不起作用；上限越小片段越多、并发越高，
+        # 但请求数更多、切点附近的上下文更少。设为 0 时只按大小上限切分
+        self.split_mode = os.getenv("MEDIA_SPLIT_MODE", "silence").lower()
+        self.segment_seconds = float(os.getenv("MEDIA_SEGMENT_SECONDS", "600")) or None
+        # 转录接口单个文件的大小上限（Groq 为 25MB，留出余量）
+        self.max_segment_bytes = int(float(os.getenv("MEDIA_MAX_SEGMENT_MB", "24")) * 1024 * 1024)
+
+        # 同时处理的视频数（下载还受各站点并发上限约束）
+        self.job_concurrency = max(1, int(os.getenv("MEDIA_JOB_CONCURRENCY", "2")))
+
+        # 分段并发转录数（1 = 逐段串行）
+        self.transcribe_concurrency = max(1, int(os.getenv("MEDIA_TRANSCRIBE_CONCURRENCY", "4")))
+        # 单段转录失败后的重试次数
+        self.transcribe_retries = int(os.getenv("MEDIA_TRANSCRIBE_RETRIES", "2"))
+        # 所有转录请求共享 Groq 配额（每分钟请求数 / 允许的瞬时请求数）
+        self.rate_limiter = get_rate_limiter(
+            "groq-audio",
+            float(os.getenv("GROQ_AUDIO_RPM", "20")),
+            int(os.getenv("GROQ_AUDIO_BURST", "4")),
+        )
+
+    def download_audio(self, url, output_dir="."):
         print("   ⬇️ [Media] 正在下载音频...")
+        output_base = os.path.join(output_dir, TEMP_AUDIO_FILE)
 
-        # 使用锁确保排队下载，不同时进行
-        with self.download_lock:
-            print("   🔄 [Media] 获取下载权限，开始下载...")
+        # 同一站点的下载排队，不同站点互不阻塞
+        extractor = get_extractor(url)
+        with _get_download_slot(extractor):
+            print(f"   🔄 [Media] 获取下载权限 ({extractor})，开始下载...")
 
             # 获取当前脚本目录下的 ffmpeg 路径
             current_dir = os.path.dirname(os.path.abspath(__file__))
             ffmpeg_path = os.path.join(current_dir, 'ffmpeg')
 
-            # yt-dlp 优化配置，解决 403 错误
+            # yt-dlp 优化配置，解决 403 错误；只下载原始音轨，编码由 encode_audio 完成
             ydl_opts = {
                 'format': 'bestaudio/best',
-                'outtmpl': TEMP_AUDIO_FILE,
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '64',  # 降低质量以减少文件大小
-                }],
+                'outtmpl': f"{output_base}.source.%(ext)s",
                 'quiet': True,
                 'no_warnings': True,
                 # 添加 User-Agent 和反反爬虫配置
@@ -49,176 +209,686 @@ class MediaHandler:
                 # 添加重试机制
                 'retries': 3,
                 'fragment_retries': 3,
-                # 指定 ffmpeg 路径
-                'ffmpeg_location': ffmpeg_path,
             }
+            # 指定 ffmpeg 路径（脚本目录下没有时使用系统 PATH 中的 ffmpeg）
+            if os.path.exists(ffmpeg_path):
+                ydl_opts['ffmpeg_location'] = ffmpeg_path
 
             try:
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([url])
-                print("   ✅ [Media] 音频下载完成")
-                return f"{TEMP_AUDIO_FILE}.mp3"
+                audio_path = self._download_and_encode(url, ydl_opts, output_base)
+                if audio_path:
+                    print("   ✅ [Media] 音频下载完成")
+                return audio_path
             except Exception as e:
                 print(f"   ❌ 下载出错: {e}")
                 # 如果是 403 错误，尝试更简单的配置
                 if "403" in str(e):
                     print("   🔄 [Media] 尝试备用下载配置...")
-                    return self._download_fallback(url)
+                    return self._download_fallback(url, output_base)
                 return None
 
-    def _download_fallback(self, url):
+    def _download_fallback(self, url, output_base=TEMP_AUDIO_FILE):
         """备用下载配置"""
         fallback_opts = {
             'format': 'worstaudio/worst',  # 使用最低质量
-            'outtmpl': TEMP_AUDIO_FILE,
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '32',
-            }],
+            'outtmpl': f"{output_base}.source.%(ext)s",
             'quiet': True,
             'no_warnings': True,
             'extract_flat': False,
         }
 
         try:
-            with yt_dlp.YoutubeDL(fallback_opts) as ydl:
-                ydl.download([url])
-            print("   ✅ [Media] 备用下载成功")
-            return f"{TEMP_AUDIO_FILE}.mp3"
+            audio_path = self._download_and_encode(url, fallback_opts, output_base, self.audio_profile['fallback_quality'])
+            if audio_path:
+                print("   ✅ [Media] 备用下载成功")
+            return audio_path
         except Exception as e:
             print(f"   ❌ 备用下载也失败: {e}")
             return None
 
-    def split_audio(self, filepath, max_duration=300):
-        """分割音频以适应 API 限制"""
-        if not os.path.exists(filepath): return []
+    def _download_and_encode(self, url, ydl_opts, output_base, quality=None):
+        """下载原始音轨后按编码方案重新编码，成功后删除原始音轨"""
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=True)
+            source = ydl.prepare_filename(info)
+        audio_path = self.encode_audio(source, output_base, quality)
+        if audio_path:
+            os.remove(source)
+        return audio_path
+
+    def encode_audio(self, source, output_base, quality=None):
+        """
+        按编码方案把音频编码为 output_base.<扩展名>，返回输出路径，失败返回 None。
+        不使用 yt-dlp 的 FFmpegExtractAudio：源音轨已是目标编码时（如 YouTube 的 Opus）它只做流复制，
+        码率、采样率、声道参数都不会生效
+        """
+        output_path = f"{output_base}.{self.audio_profile['ext']}"
+        result = subprocess.run([
+            self._binary('ffmpeg'), '-v', 'error', '-i', source,
+            *profile_ffmpeg_args(self.audio_profile, quality), '-y', output_path
+        ], capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"   ❌ 音频编码失败: {result.stderr.strip()[-200:]}")
+            return None
+        return output_path
+
+    @staticmethod
+    def _binary(name):
+        """优先使用脚本目录下自带的 ffmpeg/ffprobe（与 download_audio 传给 yt-dlp 的一致，不受工作目录影响）"""
+        local_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+        return local_path if os.path.exists(local_path) else name
 
+    def get_audio_duration(self, filepath):
+        """从容器元数据读取时长（秒），不解码音频；失败返回 None"""
         try:
-            # 使用 ffmpeg 获取音频时长
             result = subprocess.run([
-                './ffmpeg' if os.path.exists('./ffmpeg') else 'ffmpeg',
-                '-i', filepath, '-f', 'null', '-'
+                self._binary('ffprobe'), '-v', 'error',
+                '-show_entries', 'format=duration',
+                '-of', 'default=noprint_wrappers=1:nokey=1',
+                filepath
             ], capture_output=True, text=True)
+            return float(result.stdout.strip())
+        except (OSError, ValueError):
+            pass
 
-            duration_match = re.search(r'Duration: (\d+):(\d+):(\d+\.\d+)', result.stderr)
-
-            files = []
-            if duration_match:
-                hours, minutes, seconds = map(float, duration_match.groups())
-                total_seconds = hours * 3600 + minutes * 60 + seconds
+        # 没有 ffprobe 时读取 ffmpeg 打印的文件头信息（只读头部，不解码）
+        try:
+            result = subprocess.run([self._binary('ffmpeg'), '-i', filepath], capture_output=True, text=True)
+        except OSError:
+            return None
+        duration_match = re.search(r'Duration: (\d+):(\d+):(\d+\.\d+)', result.stderr)
+        if not duration_match:
+            return None
+        hours, minutes, seconds = map(float, duration_match.groups())
+        return hours * 3600 + minutes * 60 + seconds
 
-                print(f"   🎵 [Media] 音频总时长: {int(total_seconds//60)}分{int(total_seconds%60)}秒")
+    def detect_silences(self, filepath):
+        """用 ffmpeg silencedetect 找出停顿区间，返回 [(start, end), ...]"""
+        try:
+            result = subprocess.run([
+                self._binary('ffmpeg'), '-hide_banner', '-nostats', '-v', 'info',
+                '-i', filepath,
+                '-af', f"silencedetect=noise={SILENCE_NOISE_DB}dB:d={SILENCE_MIN_SECONDS}",
+                '-f', 'null', '-'
+            ], capture_output=True, text=True)
+        except OSError:
+            return []
+        starts = [float(value) for value in re.findall(r'silence_start: (-?[\d.]+)', result.stderr)]
+        ends = [float(value) for value in re.findall(r'silence_end: (-?[\d.]+)', result.stderr)]
+        return list(zip(starts, ends))
+
+    def max_segment_seconds(self, filepath, total_seconds):
+        """单段最大时长：按文件平均码率换算出不超过上传大小上限的时长（再受 MEDIA_SEGMENT_SECONDS 限制）"""
+        file_size = os.path.getsize(filepath)
+        if file_size <= self.max_segment_bytes:
+            max_seconds = total_seconds
+        else:
+            # 留 2% 余量给按数据包对齐的切点和码率波动
+            max_seconds = total_seconds * self.max_segment_bytes / file_size * 0.98
+        return min(max_seconds, self.segment_seconds) if self.segment_seconds else max_seconds
+
+    def _silence_cut_points(self, filepath, total_seconds):
+        """
+        按停顿选择切点：每段在不超过单段最大时长的前提下尽量长，
+        切点取窗口后半段内最靠后的停顿中点，找不到停顿时才在上限处硬切
+        """
+        max_seconds = self.max_segment_seconds(filepath, total_seconds)
+        if total_seconds <= max_seconds:
+            return []
+
+        pauses = sorted((start + end) / 2 for start, end in self.detect_silences(filepath))
+
+        cut_points = []
+        position = 0.0
+        while total_seconds - position > max_seconds:
+            limit = position + max_seconds
+            candidates = [pause for pause in pauses if position + max_seconds / 2 <= pause <= limit]
+            cut = candidates[-1] if candidates else limit
+            cut_points.append(cut)
+            position = cut
+
+        hard_cuts = sum(1 for cut in cut_points if cut not in pauses)
+        if hard_cuts:
+            print(f"   ⚠️ [Media] {hard_cuts} 处附近没有停顿，按时长切分")
+        return cut_points
+
+    def split_audio_segments(self, filepath, max_duration=None):
+        """
+        分割音频以适应 API 限制：一次 ffmpeg 调用（segment 复用器）切出所有片段
+        silence 模式在停顿处切分并让每段尽量接近文件大小上限；fixed 模式按 max_duration 秒
+        （默认为按大小上限换算的时长）等长切分
+        返回 [{'path', 'start', 'end'}, ...]，start/end 为片段在原音频中的精确起止秒数
+        """
+        if not os.path.exists(filepath): return []
 
-                if total_seconds <= max_duration:
-                    return [filepath]
+        total_seconds = self.get_audio_duration(filepath)
+        if total_seconds is None:
+            print("   ⚠️ 无法获取音频时长，将尝试直接转录")
+            return [{'path': filepath, 'start': 0.0, 'end': None}]
 
-                num_segments = int(total_seconds // max_duration) + 1
-                print(f"   ✂️ [Media] 音频过长，分割为 {num_segments} 段...")
+        print(f"   🎵 [Media] 音频总时长: {int(total_seconds//60)}分{int(total_seconds%60)}秒")
+        whole_file = [{'path': filepath, 'start': 0.0, 'end': total_seconds}]
 
-                for i in range(num_segments):
-                    out_name = f"{TEMP_AUDIO_FILE}_part_{i+1}.mp3"
-                    start_time = i * max_duration
+        if self.split_mode == 'silence' and max_duration is None:
+            cut_points = self._silence_cut_points(filepath, total_seconds)
+            if not cut_points:
+                return whole_file
+            print(f"   ✂️ [Media] 音频过大，在停顿处分割为 {len(cut_points) + 1} 段...")
+            segment_args = ['-segment_times', ','.join(f"{cut:.3f}" for cut in cut_points)]
+        else:
+            max_duration = max_duration or self.max_segment_seconds(filepath, total_seconds)
+            if total_seconds <= max_duration:
+                return whole_file
+            print(f"   ✂️ [Media] 音频过长，按 {max_duration:.0f} 秒分割...")
+            segment_args = ['-segment_time', str(max_duration)]
 
-                    subprocess.run([
-                        './ffmpeg' if os.path.exists('./ffmpeg') else 'ffmpeg',
-                        '-i', filepath,
-                        '-ss', str(start_time),
-                        '-t', str(max_duration),
-                        '-c', 'copy',
-                        '-y', out_name
-                    ], capture_output=True)
+        base, ext = os.path.splitext(filepath)
+        directory = os.path.dirname(filepath)
+        segment_list = f"{base}_segments.csv"
 
-                    if os.path.exists(out_name):
-                        files.append(out_name)
-                        print(f"   ✅ [Media] 创建片段 {i+1}/{num_segments}")
+        try:
+            result = subprocess.run([
+                self._binary('ffmpeg'), '-v', 'error',
+                '-i', filepath,
+                '-f', 'segment',
+                *segment_args,
+                '-segment_list', segment_list,
+                '-segment_list_type', 'csv',
+                '-reset_timestamps', '1',
+                '-c', 'copy',
+                '-y', f"{base}_part_%03d{ext}"
+            ], capture_output=True, text=True)
 
-                return files
-            else:
-                print("   ⚠️ 无法获取音频时长，将尝试直接转录")
-                return [filepath]
+            # 列表每行: 片段文件名,起始秒,结束秒（由复用器按实际切点写出）
+            segments = []
+            if os.path.exists(segment_list):
+                with open(segment_list, 'r', encoding='utf-8') as f:
+                    for row in csv.reader(f):
+                        if len(row) < 3:
+                            continue
+                        path = os.path.join(directory, os.path.basename(row[0]))
+                        if os.path.exists(path):
+                            segments.append({'path': path, 'start': float(row[1]), 'end': float(row[2])})
+                os.remove(segment_list)
+
+            if not segments:
+                print(f"   ⚠️ 分割失败，尝试直接处理原文件: {result.stderr.strip()[-200:]}")
+                return whole_file
+
+            print(f"   ✅ [Media] 创建 {len(segments)} 个片段")
+            return segments
         except Exception as e:
             print(f"   ⚠️ 分割失败，尝试直接处理原文件: {e}")
-            return [filepath]
+            return whole_file
+
+    def split_audio(self, filepath, max_duration=None):
+        """分割音频以适应 API 限制，返回片段路径列表"""
+        return [segment['path'] for segment in self.split_audio_segments(filepath, max_duration)]
 
     def transcribe(self, filepath, segment_num=None, total_segments=None):
         if not self.client:
             print("   ❌ 未配置 Groq Key")
             return ""
 
-        if segment_num and total_segments:
-            print(f"   🗣️ [Media] 正在转录第 {segment_num}/{total_segments} 段...")
-        else:
-            print(f"   🗣️ [Media] 正在转录: {filepath}...")
-
         try:
             with open(filepath, "rb") as file:
+                audio_bytes = file.read()
+        except OSError as e:
+            print(f"   ❌ 读取音频失败: {e}")
+            return ""
+
+        return self.transcribe_bytes(audio_bytes, filepath, segment_num, total_segments)
+
+    def transcribe_bytes(self, audio_bytes, filename, segment_num=None, total_segments=None):
+        """转录内存中的音频数据（filename 仅用于告知 API 音频格式）"""
+        if not self.client:
+            print("   ❌ 未配置 Groq Key")
+            return ""
+
+        if segment_num:
+            progress = f"{segment_num}/{total_segments}" if total_segments else f"{segment_num}"
+            print(f"   🗣️ [Media] 正在转录第 {progress} 段...")
+        else:
+            print(f"   🗣️ [Media] 正在转录: {filename}...")
+
+        for attempt in range(self.transcribe_retries + 1):
+            self.rate_limiter.acquire()
+            try:
                 # 使用 whisper-large-v3 强制中文识别
                 result = self.client.audio.transcriptions.create(
-                    file=(filepath, file.read()),
+                    file=(filename, audio_bytes),
                     model="whisper-large-v3",
                     response_format="text",
                     language="zh"
                 )
 
-                if segment_num and total_segments:
+                if segment_num:
                     print(f"   ✅ [Media] 第 {segment_num} 段转录完成")
 
                 return result
+            except Exception as e:
+                print(f"   ❌ 转录 API 报错: {e}")
+                if attempt >= self.transcribe_retries:
+                    break
+                # 如果是 API 限制错误，所有转录线程一起等待后重试
+                if "rate limit" in str(e).lower() or "quota" in str(e).lower():
+                    print("   ⏳ [Media] API 限制，等待 30 秒后重试...")
+                    self.rate_limiter.pause(30)
+                else:
+                    time.sleep(2 ** attempt)
+        return ""
+
+    def _cached_segment(self, cached, index, start, end):
+        """片段起止时间一致时复用已缓存的分段转录"""
+        if self._is_segment_done(cached, index, start, end):
+            print(f"   ♻️ [Media] 第 {index + 1} 段使用已缓存的转录")
+            return cached[index]['text']
+        return None
+
+    def transcribe_segments(self, segments, keep_file=None, url=None, on_text=None):
+        """
+        并发转录所有片段，按片段顺序返回文本列表（失败的片段为空字符串）
+        segments 为路径列表或 split_audio_segments 的结果；提供 url 时逐段缓存转录结果；
+        on_text 按片段顺序接收每段文本：前面的片段都完成后立即回调，供下游边转录边分析
+        """
+        segments = [seg if isinstance(seg, dict) else {'path': seg, 'start': None, 'end': None} for seg in segments]
+        total = len(segments)
+        cached = self.transcripts.get_segments(url) if url else {}
+
+        def transcribe_one(index):
+            seg = segments[index]
+            text = self._cached_segment(cached, index, seg['start'], seg['end'])
+            if text is None:
+                text = self.transcribe(seg['path'], index + 1, total)
+                if url:
+                    self.transcripts.save_segment(url, index, text, seg['start'], seg['end'])
+            # 清理已转录的分片文件（除了原始文件）；失败的片段保留，供断点续传重试
+            if text and seg['path'] != keep_file and os.path.exists(seg['path']):
+                os.remove(seg['path'])
+            return text
+
+        def deliver(results):
+            texts = []
+            for text in results:
+                texts.append(text)
+                if text and on_text:
+                    on_text(text)
+            return texts
+
+        workers = min(self.transcribe_concurrency, total)
+        if workers <= 1:
+            return deliver(transcribe_one(i) for i in range(total))
+
+        print(f"   ⚡ [Media] 并发转录 {total} 段（并发数 {workers}）...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # executor.map 按提交顺序产出结果，某段完成且之前各段都已完成时即可回调
+            return deliver(executor.map(transcribe_one, range(total)))
+
+    def _pick_subtitle(self, tracks, automatic):
+        """按语言偏好选择字幕轨道，返回 (语言, 格式信息)；自动字幕跳过机器翻译的轨道"""
+        for preferred in self.subtitle_langs:
+            for lang, formats in tracks.items():
+                # 精确匹配，或 en-US / ai-zh 这类带地区或前缀的语言代码
+                if lang != preferred and not lang.startswith(preferred + '-') and lang != f"ai-{preferred}":
+                    continue
+                if automatic:
+                    formats = [fmt for fmt in formats if 'tlang=' not in fmt.get('url', '')]
+                for ext in SUBTITLE_FORMATS:
+                    for fmt in formats:
+                        if fmt.get('ext') == ext and fmt.get('url'):
+                            return lang, fmt
+        return None, None
+
+    def fetch_subtitles(self, url):
+        """只请求视频元数据，存在中/英文字幕时下载并转换为纯文本，否则返回 None"""
+        print("   📝 [Media] 检查视频字幕...")
+        ydl_opts = {
+            'skip_download': True,
+            'quiet': True,
+            'no_warnings': True,
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'extractor_args': {
+                'youtube': {
+                    'player_client': ['android', 'web'],
+                }
+            },
+        }
+
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+                for kind, automatic in (('subtitles', False), ('automatic_captions', True)):
+                    lang, fmt = self._pick_subtitle(info.get(kind) or {}, automatic)
+                    if not fmt:
+                        continue
+                    data = ydl.urlopen(fmt['url']).read().decode('utf-8', errors='replace')
+                    text = subtitle_to_text(data, fmt['ext'])
+                    if len(text) >= 50:
+                        label = '自动字幕' if automatic else '字幕'
+                        print(f"   ✅ [Media] 使用{label} ({lang})，共 {len(text)} 字符，跳过音频下载")
+                        return text
         except Exception as e:
-            print(f"   ❌ 转录 API 报错: {e}")
-            # 如果是 API 限制错误，等待后重试
-            if "rate limit" in str(e).lower() or "quota" in str(e).lower():
-                print("   ⏳ [Media] API 限制，等待 30 秒后重试...")
-                time.sleep(30)
-                return self.transcribe(filepath, segment_num, total_segments)
-            return ""
+            print(f"   ⚠️ [Media] 获取字幕失败: {e}")
+            return None
 
-    def process_link(self, url):
-        """主入口：下载 -> 分割 -> 转录 -> 合并文本"""
+        print("   ℹ️ [Media] 没有可用字幕，转为音频转录")
+        return None
+
+    def process_link(self, url, on_text=None):
+        """
+        主入口：下载 -> 分割 -> 转录 -> 合并文本（所有临时文件放在任务独立目录中）
+        on_text 按顺序接收转录文本片段（拼接方式与返回的全文一致：以空行分隔），
+        可在全部转录完成前开始下游分析；流式模式在下载结束后才回调，避免回退到下载模式时重复
+        """
         print(f"   🔗 [Media] 开始处理链接: {url}")
+        on_text = on_text or (lambda text: None)
+
+        cached_text = self.transcripts.get(url)
+        if cached_text:
+            print(f"   ♻️ [Media] 使用已缓存的转录，共 {len(cached_text)} 字符")
+            on_text(cached_text)
+            return cached_text
+
+        if self.prefer_subtitles:
+            subtitle_text = self.fetch_subtitles(url)
+            if subtitle_text:
+                self.transcripts.save(url, subtitle_text)
+                on_text(subtitle_text)
+                return subtitle_text
+
+        audio_hash = None
+        full_text, failed = self._process_streaming(url) if self.streaming else ([], 0)
+        for text in full_text:
+            on_text(text)
+        if not full_text:
+            if self.streaming:
+                print("   🔄 [Media] 流式处理失败，改为下载后处理...")
+            if self.checkpoints:
+                full_text, failed, audio_hash = self._process_checkpointed(url, on_text)
+            else:
+                with job_workspace() as workspace:
+                    full_text, failed, audio_hash = self._process_in_workspace(url, workspace, on_text=on_text)
+                print("   🧹 [Media] 临时音频文件已清理")
 
-        audio_path = self.download_audio(url)
-        if not audio_path:
-            print("   ❌ [Media] 音频下载失败")
+        if full_text:
+            combined_text = "\n\n".join(full_text)
+            print(f"   ✅ [Media] 转录完成，总计 {len(combined_text)} 字符")
+            # 有片段失败时只保留分段缓存，下次只补转失败的片段
+            if not failed:
+                self.transcripts.save(url, combined_text, audio_hash)
+            return combined_text
+        else:
+            print("   ❌ [Media] 所有片段转录失败")
             return None
 
+    def _job_dir(self, url):
+        extractor, video_id = parse_video_key(url)
+        return os.path.join(self.jobs_dir, f"{extractor}_{video_id}")
+
+    def _load_manifest(self, job_dir):
+        try:
+            with open(os.path.join(job_dir, JOB_MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, job_dir, manifest):
+        manifest['updated_at'] = time.time()
+        path = os.path.join(job_dir, JOB_MANIFEST_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def _cleanup_stale_jobs(self):
+        """删除长时间未更新的断点（视频已下架或反复失败）"""
+        if not os.path.isdir(self.jobs_dir):
+            return
+        now = time.time()
+        for name in os.listdir(self.jobs_dir):
+            job_dir = os.path.join(self.jobs_dir, name)
+            manifest = self._load_manifest(job_dir)
+            updated_at = manifest.get('updated_at') or os.path.getmtime(job_dir)
+            if now - updated_at > self.job_ttl:
+                shutil.rmtree(job_dir, ignore_errors=True)
+
+    def _process_checkpointed(self, url, on_text=None):
+        """在以视频 ID 命名的任务目录中处理；全部成功后删除目录，否则保留断点"""
+        job_dir = self._job_dir(url)
+        os.makedirs(job_dir, exist_ok=True)
+        full_text, failed, audio_hash = self._process_in_workspace(url, job_dir, checkpoint=True, on_text=on_text)
+
+        if full_text and not failed:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            print("   🧹 [Media] 临时音频文件已清理")
+        else:
+            print(f"   💾 [Media] 已保留断点 {job_dir}，下次从未完成的片段继续")
+        return full_text, failed, audio_hash
+
+    def _resume_segments(self, url, workspace, manifest):
+        """断点中的分段仍可用（每段要么已转录、要么分片文件还在）时直接复用"""
+        segments = manifest.get('segments')
+        if not segments:
+            return None
+        cached = self.transcripts.get_segments(url)
+        resumed = []
+        remaining = 0
+        for index, segment in enumerate(segments):
+            path = os.path.join(workspace, segment['file'])
+            if not self._is_segment_done(cached, index, segment['start'], segment['end']):
+                if not os.path.exists(path):
+                    return None
+                remaining += 1
+            resumed.append({'path': path, 'start': segment['start'], 'end': segment['end']})
+
+        print(f"   ⏩ [Media] 从断点继续：{len(resumed)} 段中还有 {remaining} 段待转录")
+        return resumed
+
+    @staticmethod
+    def _is_segment_done(cached, index, start, end):
+        """
+        缓存的分段覆盖的音频与当前片段相同才算完成：流式分块、停顿切分、等长切分等不同分段方式共用同一份缓存，
+        第 0 段的起点总是 0，只比较起点会把较短片段的转录当成较长片段的，丢掉中间的音频
+        """
+        segment = cached.get(index)
+        if not segment or not segment.get('text'):
+            return False
+
+        def same(cached_value, value):
+            if cached_value is None or value is None:
+                return cached_value is None and value is None
+            return abs(cached_value - value) <= SEGMENT_MATCH_TOLERANCE
+
+        return same(segment.get('start'), start) and same(segment.get('end'), end)
+
+    def _process_in_workspace(self, url, workspace, checkpoint=False, on_text=None):
+        """返回 (分段文本列表, 失败片段数, 音频哈希)；checkpoint 时复用并更新任务目录中的断点"""
+        on_text = on_text or (lambda text: None)
+        manifest = self._load_manifest(workspace) if checkpoint else {}
+        audio_path = os.path.join(workspace, manifest['audio_file']) if manifest.get('audio_file') else None
+
+        if audio_path and os.path.exists(audio_path):
+            print("   ⏩ [Media] 使用断点中已下载的音频")
+            audio_hash = manifest.get('audio_sha256') or hash_file(audio_path)
+        else:
+            # yt-dlp 会接着上次中断的 .part 文件继续下载
+            audio_path = self.download_audio(url, workspace)
+            if not audio_path:
+                print("   ❌ [Media] 音频下载失败")
+                return [], 0, None
+            audio_hash = hash_file(audio_path)
+            manifest = {'url': url, 'audio_file': os.path.basename(audio_path), 'audio_sha256': audio_hash}
+            if checkpoint:
+                self._save_manifest(workspace, manifest)
+
         print("   📂 [Media] 音频下载成功，开始处理...")
-        segments = self.split_audio(audio_path)
+        # 同一音频换了链接（转载、短链）时直接复用转录
+        cached_text = self.transcripts.get_by_audio(audio_hash)
+        if cached_text:
+            print("   ♻️ [Media] 相同音频已转录过，使用缓存")
+            on_text(cached_text)
+            return [cached_text], 0, audio_hash
+
+        segments = self._resume_segments(url, workspace, manifest) if checkpoint else None
+        if segments is None:
+            segments = self.split_audio_segments(audio_path)
+            if checkpoint:
+                manifest['segments'] = [
+                    {'file': os.path.basename(seg['path']), 'start': seg['start'], 'end': seg['end']}
+                    for seg in segments
+                ]
+                self._save_manifest(workspace, manifest)
         full_text = []
+        failed = []
 
         if len(segments) == 1:
             print("   🎵 [Media] 音频较短，直接转录...")
             text = self.transcribe(audio_path)
             if text:
                 full_text.append(text)
+                on_text(text)
+            else:
+                failed.append(1)
         else:
             print(f"   📱 [Media] 音频较长，将分 {len(segments)} 段转录...")
 
-            # 转录每个片段，支持错误恢复
-            for i, seg in enumerate(segments):
-                segment_num = i + 1
-                text = self.transcribe(seg, segment_num, len(segments))
-
-                if text:
-                    full_text.append(text)
-                    print(f"   📊 [Media] 当前进度: {segment_num}/{len(segments)} 段")
-                else:
-                    print(f"   ⚠️ [Media] 第 {segment_num} 段转录失败，继续下一段")
+            # 并发转录，按片段顺序拼接；单段失败不影响其他片段
+            texts = self.transcribe_segments(segments, keep_file=audio_path, url=url, on_text=on_text)
+            failed = [i + 1 for i, text in enumerate(texts) if not text]
+            full_text.extend(text for text in texts if text)
+
+            if failed:
+                print(f"   ⚠️ [Media] 第 {', '.join(map(str, failed))} 段转录失败，已跳过")
+            print(f"   📊 [Media] 转录完成 {len(segments) - len(failed)}/{len(segments)} 段")
+
+        return full_text, len(failed), audio_hash
+
+    def stream_chunk_seconds(self):
+        """流式切块时长：与下载模式相同取 MEDIA_SEGMENT_SECONDS，并保证每块不超过上传大小上限"""
+        max_seconds = self.max_segment_bytes * 8 / STREAM_BITRATE
+        return min(self.segment_seconds or STREAM_CHUNK_SECONDS, max_seconds)
+
+    def stream_audio_chunks(self, url, chunk_seconds=None):
+        """
+        流式下载：yt-dlp 输出到管道，由一个 ffmpeg 进程转码为 CBR MP3 输出到 stdout，
+        按 MP3 帧边界切成约 chunk_seconds 秒的块逐个返回（每块都是可独立解码的 MP3）
+        """
+        chunk_seconds = chunk_seconds or self.stream_chunk_seconds()
+        ffmpeg_path = self._binary('ffmpeg')
+        frames_per_chunk = max(1, round(chunk_seconds * STREAM_SAMPLE_RATE / MP3_FRAME_SAMPLES))
+        chunk_bytes = frames_per_chunk * MP3_FRAME_BYTES
+
+        extractor = get_extractor(url)
+        with _get_download_slot(extractor):
+            print(f"   🔄 [Media] 获取下载权限 ({extractor})，开始流式下载...")
+            downloader = subprocess.Popen([
+                sys.executable, '-m', 'yt_dlp',
+                '-f', 'bestaudio/best', '-o', '-',
+                '--quiet', '--no-warnings', '--no-part',
+                '--retries', '3', '--fragment-retries', '3',
+                '--user-agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                '--extractor-args', 'youtube:player_client=android,web',
+                url
+            ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            encoder = subprocess.Popen([
+                ffmpeg_path, '-v', 'error', '-i', 'pipe:0', '-vn',
+                '-ac', '1', '-ar', str(STREAM_SAMPLE_RATE),
+                '-c:a', 'libmp3lame', '-b:a', str(STREAM_BITRATE),
+                # 不写 ID3/Xing 头，输出只包含定长音频帧
+                '-id3v2_version', '0', '-write_id3v1', '0', '-write_xing', '0',
+                '-f', 'mp3', 'pipe:1'
+            ], stdin=downloader.stdout, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            # 让 ffmpeg 独占管道读端，yt-dlp 才能在 ffmpeg 退出时收到 SIGPIPE
+            downloader.stdout.close()
 
-                # 清理分片文件（除了原始文件）
-                if seg != audio_path and os.path.exists(seg):
-                    os.remove(seg)
-
-        # 清理原始音频文件
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-            print("   🧹 [Media] 临时音频文件已清理")
+            try:
+                while True:
+                    chunk = encoder.stdout.read(chunk_bytes)
+                    if not chunk:
+                        break
+                    yield chunk
+                # 下载中断时输出不完整，交给调用方回退到普通下载
+                download_code, encode_code = downloader.wait(), encoder.wait()
+                if download_code != 0 or encode_code != 0:
+                    raise RuntimeError(f"yt-dlp 退出码 {download_code}，ffmpeg 退出码 {encode_code}")
+            finally:
+                for process in (encoder, downloader):
+                    if process.poll() is None:
+                        process.kill()
+                    process.wait()
+                encoder.stdout.close()
+
+    def _process_streaming(self, url, chunk_seconds=None):
+        """边下载边转录：每产出一块就提交转录，按块顺序拼接"""
+        print("   🌊 [Media] 流式下载并转录...")
+        chunk_seconds = chunk_seconds or self.stream_chunk_seconds()
+        chunk_duration = round(chunk_seconds * STREAM_SAMPLE_RATE / MP3_FRAME_SAMPLES) * MP3_FRAME_SAMPLES / STREAM_SAMPLE_RATE
+        cached = self.transcripts.get_segments(url)
+
+        def transcribe_chunk(index, chunk):
+            start = round(index * chunk_duration, 3)
+            end = round(start + len(chunk) // MP3_FRAME_BYTES * MP3_FRAME_SAMPLES / STREAM_SAMPLE_RATE, 3)
+            text = self._cached_segment(cached, index, start, end)
+            if text is None:
+                text = self.transcribe_bytes(chunk, f"chunk_{index + 1}.mp3", index + 1)
+                self.transcripts.save_segment(url, index, text, start, end)
+            return text
+
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.transcribe_concurrency) as executor:
+            try:
+                for i, chunk in enumerate(self.stream_audio_chunks(url, chunk_seconds)):
+                    futures.append(executor.submit(transcribe_chunk, i, chunk))
+            except (OSError, RuntimeError) as e:
+                print(f"   ❌ [Media] 流式处理出错: {e}")
+                for future in futures:
+                    future.cancel()
+                return [], 0
+            texts = [future.result() for future in futures]
+
+        if not texts:
+            return [], 0
+        failed = [i + 1 for i, text in enumerate(texts) if not text]
+        if failed:
+            print(f"   ⚠️ [Media] 第 {', '.join(map(str, failed))} 段转录失败，已跳过")
+        print(f"   📊 [Media] 转录完成 {len(texts) - len(failed)}/{len(texts)} 段")
+        return [text for text in texts if text], len(failed)
+
+    def iter_process_links(self, items, get_link=None, get_on_text=None):
+        """
+        并发处理多个视频，按输入顺序返回 (item, transcript)。
+        items 可以是惰性迭代器：最多提前取 job_concurrency 个任务，处理完一个再补一个。
+        get_on_text(item) 返回该视频的 on_text 回调（见 process_link），用于边转录边分析
+        """
+        get_link = get_link or (lambda item: item)
+        items = iter(items)
+
+        def run(item):
+            link = get_link(item)
+            if not link:
+                return None
+            try:
+                return self.process_link(link, on_text=get_on_text(item) if get_on_text else None)
+            except Exception as e:
+                print(f"   ❌ [Media] 处理链接出错 {link}: {e}")
+                return None
 
-        if full_text:
-            combined_text = "\n\n".join(full_text)
-            print(f"   ✅ [Media] 转录完成，总计 {len(combined_text)} 字符")
-            return combined_text
-        else:
-            print("   ❌ [Media] 所有片段转录失败")
-            return None
\ No newline at end of file
+        with ThreadPoolExecutor(max_workers=self.job_concurrency) as executor:
+            pending = deque()
+            try:
+                for item in items:
+                    pending.append((item, executor.submit(run, item)))
+                    if len(pending) >= self.job_concurrency:
+                        item, future = pending.popleft()
+                        yield item, future.result()
+                while pending:
+                    item, future = pending.popleft()
+                    yield item, future.result()
+            finally:
+                # 提前退出时取消尚未开始的任务
+                for _, future in pending:
+                    future.cancel()
+
+    def process_links(self, urls):
+        """并发处理多个链接，返回与 urls 顺序一致的转录文本列表"""
+        return [transcript for _, transcript in self.iter_process_links(urls)]
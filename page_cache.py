@@ -0,0 +1,193 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from http_client import get_session
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+PAGE_CACHE_DIR = "page_cache"
+
+# 不影响页面内容的追踪参数，规范化 URL 时去掉
+TRACKING_PARAMS = {"scene", "srcid", "sharer_sharetime", "sharer_shareid", "from", "isappinstalled",
+                   "clicktime", "enterid", "ascene", "devicetype", "version", "nettype"}
+
+
+def normalize_url(url):
+    """规范化 URL：小写协议/域名，去掉锚点和追踪参数，查询参数排序"""
+    parts = urlsplit(url.strip())
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith("utm_")
+    ]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", urlencode(sorted(query)), ""))
+
+
+class PageCache:
+    """原始网页磁盘缓存：按规范化 URL 哈希存放压缩的 HTML + 响应头，带 TTL 与容量上限 (LRU 淘汰)"""
+
+    def __init__(self, cache_dir=None, max_bytes=None, ttl=None):
+        self.cache_dir = cache_dir or os.getenv("PAGE_CACHE_DIR", PAGE_CACHE_DIR)
+        self.max_bytes = max_bytes or int(float(os.getenv("PAGE_CACHE_MAX_MB", "500")) * 1024 * 1024)
+        self.ttl = ttl or float(os.getenv("PAGE_CACHE_TTL_HOURS", "168")) * 3600
+        self.enabled = os.getenv("PAGE_CACHE_ENABLED", "true").lower() != "false"
+        self.lock = threading.Lock()
+        self.total_bytes = None  # 首次写入时统计
+
+    def _paths(self, url):
+        key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        directory = os.path.join(self.cache_dir, key[:2])
+        return directory, os.path.join(directory, key + ".json")
+
+    def get(self, url):
+        """命中且未过期时返回 (body, headers)，否则返回 None"""
+        if not self.enabled:
+            return None
+        _, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if time.time() - meta["fetched_at"] > self.ttl:
+                return None
+            body_path = os.path.join(os.path.dirname(meta_path), meta["body_file"])
+            with open(body_path, "rb") as f:
+                body = self._decompress(f.read(), meta["encoding"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # 更新访问时间，供 LRU 淘汰使用
+        now = time.time()
+        for path in (meta_path, body_path):
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return body, meta.get("headers", {})
+
+    def put(self, url, body, headers=None):
+        if not self.enabled:
+            return
+        directory, meta_path = self._paths(url)
+        os.makedirs(directory, exist_ok=True)
+
+        encoding = "zstd" if zstandard is not None else "gzip"
+        body_file = os.path.basename(meta_path)[:-len(".json")] + (".html.zst" if encoding == "zstd" else ".html.gz")
+        body_path = os.path.join(directory, body_file)
+        data = self._compress(body, encoding)
+        meta = {
+            "url": url,
+            "normalized_url": normalize_url(url),
+            "fetched_at": time.time(),
+            "encoding": encoding,
+            "body_file": body_file,
+            "size": len(body),
+            "headers": dict(headers or {}),
+        }
+
+        old_size = self._file_size(body_path) + self._file_size(meta_path)
+        self._atomic_write(body_path, data)
+        self._atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        new_size = self._file_size(body_path) + self._file_size(meta_path)
+
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = self._scan_total()
+            else:
+                self.total_bytes += new_size - old_size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def fetch(self, url, headers=None, timeout=15):
+        """读穿缓存：命中直接返回页面 bytes，否则下载并写入缓存"""
+        cached = self.get(url)
+        if cached is not None:
+            return cached[0]
+
+        response = get_session().get(url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        self.put(url, response.content, {
+            key: value for key, value in response.headers.items()
+            if key.lower() in ("content-type", "etag", "last-modified", "date")
+        })
+        return response.content
+
+    def invalidate(self, url):
+        """删除某个 URL 的缓存（例如正文提取失败的验证页、空页面），下次会重新下载"""
+        directory, meta_path = self._paths(url)
+        stem = meta_path[:-len(".json")]
+        removed = 0
+        for path in (meta_path, stem + ".html.gz", stem + ".html.zst"):
+            size = self._file_size(path)
+            try:
+                os.remove(path)
+                removed += size
+            except OSError:
+                pass
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes -= removed
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到低于容量上限的 90%"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    meta_path = os.path.join(root, name)
+                    stem = meta_path[:-len(".json")]
+                    paths = [meta_path] + [stem + ext for ext in (".html.gz", ".html.zst") if os.path.exists(stem + ext)]
+                    entries.append((os.path.getmtime(meta_path), paths))
+
+        entries.sort(key=lambda item: item[0])
+        target = self.max_bytes * 0.9
+        for _, paths in entries:
+            if self.total_bytes <= target:
+                break
+            for path in paths:
+                size = self._file_size(path)
+                try:
+                    os.remove(path)
+                    self.total_bytes -= size
+                except OSError:
+                    pass
+
+    def _scan_total(self):
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                total += self._file_size(os.path.join(root, name))
+        return total
+
+    @staticmethod
+    def _compress(data, encoding):
+        if encoding == "zstd":
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    @staticmethod
+    def _decompress(data, encoding):
+        if encoding == "zstd":
+            if zstandard is None:
+                raise ValueError("zstandard 未安装，无法读取 zstd 缓存")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    @staticmethod
+    def _atomic_write(path, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _file_size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
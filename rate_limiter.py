@@ -0,0 +1,55 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """令牌桶限流器：多个线程共享同一个 API 的请求配额"""
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        # 桶容量：允许的瞬时并发请求数
+        self.capacity = max(1, burst or 1)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        # 收到限流响应后，所有线程暂停到该时间点
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """阻塞直到拿到一个令牌"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.blocked_until:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.blocked_until - now
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """接口返回限流时调用：所有共享该限流器的线程一起等待，并清空令牌避免恢复后瞬间打满"""
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0.0
+            self.updated_at = max(self.updated_at, self.blocked_until)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name, rate_per_minute, burst=None):
+    """按名称获取进程内共享的限流器（同一 API 的所有调用方共用配额）"""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(rate_per_minute, burst)
+        return _limiters[name]
@@ -1,48 +1,128 @@
-import feedparser
-import json
+import calendar
 import os
-import datetime
-
-HISTORY_FILE = "history.json"
+import feedparser
+from feed_cache import get_feed_cache
+from state_store import get_state_store
 
 class RSSManager:
     def __init__(self):
-        pass
-
-    def load_history(self):
-        if os.path.exists(HISTORY_FILE):
-            try:
-                with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-
-    def save_history(self, history):
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        self.feed_cache = get_feed_cache()
+        self.store = get_state_store()
+        # 每个订阅源每次运行最多处理的条目数（剩余的留到下次，从旧到新）
+        self.max_entries_per_run = int(os.getenv("RSS_MAX_ENTRIES_PER_RUN", "5"))
+        # 首次订阅（没有任何水位）时只处理最新的几条，避免把整个频道历史都跑一遍
+        self.bootstrap_entries = int(os.getenv("RSS_BOOTSTRAP_ENTRIES", "1"))
+        # 条目交出处理多少次仍未完成后放弃（标记为已处理），避免坏条目一直占用每次的处理名额
+        self.max_entry_failures = int(os.getenv("RSS_MAX_ENTRY_FAILURES", "3"))
 
     def is_new(self, rss_url, video_id):
-        history = self.load_history()
-        last_id = history.get(rss_url, {}).get('last_id')
-        return last_id != video_id
+        return not self.store.is_processed(rss_url, video_id)
 
     def update_history(self, rss_url, video_id, title):
-        history = self.load_history()
-        history[rss_url] = {
-            'last_id': video_id,
-            'title': title,
-            'updated_at': str(datetime.datetime.now())
-        }
-        self.save_history(history)
+        self.store.mark_processed(rss_url, video_id, title)
+        self.store.set_watermark(rss_url, video_id, title)
 
-    def parse_feed(self, rss_url):
+    def fetch_entries(self, rss_url, timeout=15, raise_errors=False, deadline=None):
+        """获取订阅的全部条目（订阅未更新或出错时返回空列表）；deadline 见 FeedCache.fetch"""
         print(f"📡 检查订阅: {rss_url} ...")
         try:
-            feed = feedparser.parse(rss_url)
+            body = self.feed_cache.fetch(rss_url, timeout=timeout, deadline=deadline)
+            if body is None:
+                print("   💤 订阅未更新，跳过解析")
+                return []
+            feed = feedparser.parse(body)
             if not feed.entries:
-                return None
-            return feed.entries[0] # 只取最新的一条
+                self.feed_cache.invalidate(rss_url)
+            return list(feed.entries)
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"   ❌ RSS 解析错误: {e}")
-            return None
\ No newline at end of file
+            return []
+
+    def parse_feed(self, rss_url):
+        entries = self.fetch_entries(rss_url)
+        return entries[0] if entries else None # 只取最新的一条
+
+    @staticmethod
+    def get_entry_id(entry):
+        link = entry.get('link', '')
+        return entry.get('id') or (link.split('/')[-1] if link else '')
+
+    @staticmethod
+    def get_entry_published(entry):
+        published = entry.get('published_parsed') or entry.get('updated_parsed')
+        return float(calendar.timegm(published)) if published else None
+
+    def get_new_entries(self, rss_url, entries=None, max_items=None):
+        """
+        逐条返回订阅中比水位新的条目（本次最多 max_items 条），从旧到新排列。
+        新条目 = 未处理过的 ID，且发布时间不早于已处理的最新发布时间（重排的旧条目不会被重复处理）；
+        之前交给调用方但没有处理完的条目（处理失败或进程中途退出）不受发布时间限制，继续重试。
+        调用方处理完每条后需调用 mark_entry_processed 推进水位，整批结束后调用 finish_entries。
+        """
+        if entries is None:
+            entries = self.fetch_entries(rss_url)
+        if not entries:
+            return
+
+        max_items = max_items or self.max_entries_per_run
+        watermark = self.store.get_watermark(rss_url)
+        last_published = watermark.get('last_published') if watermark else None
+
+        candidates = []
+        for position, entry in enumerate(entries):
+            entry_id = self.get_entry_id(entry)
+            # 旧版历史只记录了 last_id：订阅中排在它之后的都是更早的条目
+            # （迁移时 last_id 也登记为已处理，所以要先于已处理判断）
+            if entry_id and watermark and last_published is None and entry_id == watermark.get('last_id'):
+                break
+            if not entry_id or self.store.is_processed(rss_url, entry_id):
+                continue
+            failures = self.store.get_failures(rss_url, entry_id)
+            if failures >= self.max_entry_failures:
+                print(f"   ❌ 条目已连续 {failures} 次未处理完，不再重试: {entry.get('title', entry_id)}")
+                self.store.mark_processed(rss_url, entry_id, entry.get('title', ''))
+                continue
+            published = self.get_entry_published(entry)
+            if not failures and last_published is not None and published is not None and published < last_published:
+                continue
+            candidates.append((published, position, entry))
+
+        if watermark is None:
+            # 订阅顺序是新的在前
+            candidates = candidates[:self.bootstrap_entries]
+
+        # 从旧到新：有发布时间的按时间排序，否则按订阅中的倒序
+        candidates.sort(key=lambda item: (item[0] if item[0] is not None else float('inf'), -item[1]))
+        if len(candidates) > max_items:
+            print(f"   ⏳ 新条目 {len(candidates)} 条，本次处理最早的 {max_items} 条")
+            # 剩余的条目留到下次，下次必须完整拉取订阅，不能被 304 挡住
+            self.feed_cache.invalidate(rss_url)
+
+        for _, _, entry in candidates[:max_items]:
+            # 交出前先计一次未完成，mark_entry_processed 之前进程退出也能在下次被识别为重试
+            self.store.record_failure(rss_url, self.get_entry_id(entry))
+            yield entry
+
+    def count_first_seen(self, rss_url, entries):
+        """登记订阅中的全部条目，返回首次出现的条数（供轮询计划估算发布频率）；需在 get_new_entries 之前调用"""
+        return self.store.mark_seen(rss_url, [self.get_entry_id(entry) for entry in entries])
+
+    def finish_entries(self, rss_url):
+        """整批处理结束后调用：还有交出后未处理完的条目时清除订阅缓存，下次完整拉取"""
+        if self.store.has_unfinished(rss_url):
+            self.feed_cache.invalidate(rss_url)
+
+    def mark_entry_processed(self, rss_url, entry):
+        """标记条目已处理，并把水位推进到该条目的发布时间"""
+        entry_id = self.get_entry_id(entry)
+        title = entry.get('title', '')
+        published = self.get_entry_published(entry)
+        watermark = self.store.get_watermark(rss_url)
+
+        self.store.mark_processed(rss_url, entry_id, title)
+        last_published = watermark.get('last_published') if watermark else None
+        if published is None or last_published is None or published >= last_published:
+            self.store.set_watermark(rss_url, entry_id, title, published)
+
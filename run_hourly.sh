@@ -1,9 +1,9 @@
 #!/bin/bash
 
 # RSS-Github 自动监控脚本
-# 每小时运行一次，推送到飞书
+# 定期唤醒，由 main.py 按各订阅源的发布频率决定是否真正检查，推送到飞书
 
-echo "🚀 启动RSS-Github每小时监控服务..."
+echo "🚀 启动RSS-Github自适应监控服务..."
 echo "📅 服务启动时间: $(date)"
 echo "📁 工作目录: $(pwd)"
 
@@ -13,19 +13,21 @@ source venv/bin/activate
 # 确保环境变量已加载
 export $(cat .env | xargs)
 
-# 无限循环，每小时运行一次
+# 唤醒间隔（秒），实际轮询频率由自适应调度决定
+POLL_TICK_SECONDS=${POLL_TICK_SECONDS:-900}
+
+# 无限循环，定期唤醒检查到期的订阅源
 while true; do
     echo ""
     echo "=" $(date) "="
     echo "🔄 开始新一轮监控..."
 
     # 运行主程序
-    python main.py
+    python main.py --once
 
     echo "✅ 本轮监控完成，等待下一轮..."
-    echo "⏰ 下次运行时间: $(date -d '+1 hour' '+%Y-%m-%d %H:%M:%S')"
+    echo "⏰ 下次唤醒时间: $(date -d "+${POLL_TICK_SECONDS} seconds" '+%Y-%m-%d %H:%M:%S')"
     echo ""
 
-    # 等待3600秒（1小时）
-    sleep 3600
+    sleep "$POLL_TICK_SECONDS"
 done
\ No newline at end of file
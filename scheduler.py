@@ -0,0 +1,79 @@
+import os
+import time
+from state_store import get_state_store
+
+
+class PollScheduler:
+    """
+    按订阅源自适应安排轮询时间。
+    每个源记录发布速率（条/小时，指数滑动平均）：有新内容时按速率收紧间隔，
+    连续空轮询时间隔指数退避，均限制在 [最小间隔, 最大间隔] 内。状态保存在 state.db，跨进程生效。
+    """
+
+    def __init__(self, store=None, min_interval=None, max_interval=None, initial_interval=None):
+        self.store = store or get_state_store()
+        self.min_interval = min_interval or float(os.getenv("POLL_MIN_MINUTES", "15")) * 60
+        self.max_interval = max_interval or float(os.getenv("POLL_MAX_HOURS", "24")) * 3600
+        self.initial_interval = initial_interval or float(os.getenv("POLL_INITIAL_HOURS", "1")) * 3600
+        # 发布速率的平滑系数，越大越偏向最近一次观测
+        self.rate_alpha = 0.3
+        # 每个预期发布间隔内轮询的次数，越大延迟越低、请求越多
+        self.polls_per_item = 2
+
+    def _clamp(self, interval):
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def is_due(self, source, now=None):
+        schedule = self.store.get_schedule(source)
+        return schedule is None or (now or time.time()) >= schedule['next_poll']
+
+    def due_sources(self, sources, now=None):
+        now = now or time.time()
+        return [source for source in sources if self.is_due(source, now)]
+
+    def seconds_until_due(self, sources, now=None):
+        """距离最近一个源到期还有多少秒（已有到期的返回 0）"""
+        now = now or time.time()
+        waits = []
+        for source in sources:
+            schedule = self.store.get_schedule(source)
+            waits.append(0 if schedule is None else max(0, schedule['next_poll'] - now))
+        return min(waits) if waits else self.min_interval
+
+    def record_poll(self, source, new_items, now=None):
+        """记录一次轮询结果（发现的新条目数），返回下次轮询时间戳"""
+        now = now or time.time()
+        schedule = self.store.get_schedule(source)
+        if schedule is None:
+            schedule = {'interval': self.initial_interval, 'last_poll': None, 'rate': 0.0, 'quiet_polls': 0}
+
+        elapsed_hours = (now - schedule['last_poll']) / 3600 if schedule['last_poll'] else schedule['interval'] / 3600
+        observed_rate = new_items / max(elapsed_hours, 1e-6)
+        rate = self.rate_alpha * observed_rate + (1 - self.rate_alpha) * schedule['rate']
+
+        if new_items > 0:
+            quiet_polls = 0
+            # 至少减半，活跃的源能很快回到高频轮询
+            interval = self._clamp(min(schedule['interval'] / 2, 3600 / (rate * self.polls_per_item)))
+        else:
+            quiet_polls = schedule['quiet_polls'] + 1
+            interval = self._clamp(schedule['interval'] * 2)
+
+        next_poll = now + interval
+        self.store.set_schedule(source, interval, next_poll, now, rate, quiet_polls)
+        return next_poll
+
+    def record_error(self, source, now=None):
+        """
+        记录一次失败的轮询（网络错误、响应无法解析等）：不算空轮询，间隔和发布速率保持不变，
+        按最小间隔稍后重试。返回下次轮询时间戳
+        """
+        now = now or time.time()
+        schedule = self.store.get_schedule(source)
+        if schedule is None:
+            schedule = {'interval': self.initial_interval, 'last_poll': None, 'rate': 0.0, 'quiet_polls': 0}
+
+        next_poll = now + self.min_interval
+        self.store.set_schedule(source, schedule['interval'], next_poll, schedule['last_poll'],
+                                schedule['rate'], schedule['quiet_polls'])
+        return next_poll
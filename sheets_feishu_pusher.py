@@ -1,8 +1,8 @@
-import requests
 import os
 import json
 import time
 from dotenv import load_dotenv
+from http_client import get_session
 
 load_dotenv()
 
@@ -12,6 +12,7 @@ class SheetsFeishuPusher:
     注意：这与多维表格 (Bitable) 不同，使用不同的API端点
     """
     def __init__(self):
+        self.session = get_session()
         self.app_id = os.getenv("FEISHU_APP_ID")
         self.app_secret = os.getenv("FEISHU_APP_SECRET")
         self.spreadsheet_token = os.getenv("FEISHU_BITABLE_APP_TOKEN")  # 电子表格token
@@ -26,7 +27,7 @@ class SheetsFeishuPusher:
 
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -58,7 +59,7 @@ class SheetsFeishuPusher:
         url = f"https://open.feishu.cn/open-apis/sheets/v3/spreadsheets/{self.spreadsheet_token}/sheets/query"
         headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
-        response = requests.get(url, headers=headers)
+        response = self.session.get(url, headers=headers)
         if response.status_code == 200:
             return response.json()
         else:
@@ -94,7 +95,7 @@ class SheetsFeishuPusher:
             "Content-Type": "application/json"
         }
 
-        response = requests.put(url, headers=headers, json=payload)
+        response = self.session.put(url, headers=headers, json=payload)
 
         if response.status_code == 200:
             print("✅ 数据写入成功")
@@ -118,7 +119,7 @@ class SheetsFeishuPusher:
         read_url = f"https://open.feishu.cn/open-apis/sheets/v2/spreadsheets/{self.spreadsheet_token}/values/{self.sheet_id}!A1:Z1000"
         headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
-        read_response = requests.get(read_url, headers=headers)
+        read_response = self.session.get(read_url, headers=headers)
 
         if read_response.status_code == 200:
             read_data = read_response.json()
@@ -147,7 +148,7 @@ class SheetsFeishuPusher:
             "Content-Type": "application/json"
         }
 
-        response = requests.put(url, headers=headers, json=payload)
+        response = self.session.put(url, headers=headers, json=payload)
 
         if response.status_code == 200:
             print("✅ 数据写入成功")
@@ -211,7 +212,7 @@ class SheetsFeishuPusher:
         url = f"https://open.feishu.cn/open-apis/sheets/v3/spreadsheets/{self.spreadsheet_token}"
         headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
-        response = requests.get(url, headers=headers)
+        response = self.session.get(url, headers=headers)
 
         if response.status_code == 200:
             data = response.json()
@@ -0,0 +1,314 @@
+import atexit
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+
+STATE_DB_FILE = "state.db"
+# 旧版 JSON 历史文件，首次打开数据库时自动导入
+LEGACY_RSS_HISTORY_FILE = "history.json"
+LEGACY_WEWE_HISTORY_FILE = "wewe_history.json"
+
+WEWE_SOURCE = "wewe"
+
+
+class StateStore:
+    """处理状态存储（SQLite WAL）：已处理条目 + 各订阅源水位 + 条目首次出现时间与失败次数"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.getenv("STATE_DB_FILE", STATE_DB_FILE)
+        self.lock = threading.RLock()
+
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+        self.migrate_json_history()
+        atexit.register(self.close)
+
+    def _init_schema(self):
+        with self.lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS processed_items (
+                    source TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    title TEXT,
+                    processed_at TEXT NOT NULL,
+                    PRIMARY KEY (source, item_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_processed_item_id ON processed_items (item_id);
+
+                CREATE TABLE IF NOT EXISTS watermarks (
+                    source TEXT PRIMARY KEY,
+                    last_id TEXT,
+                    last_published REAL,
+                    title TEXT,
+                    updated_at TEXT NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS seen_items (
+                    source TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    first_seen REAL NOT NULL,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (source, item_id)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS poll_schedule (
+                    source TEXT PRIMARY KEY,
+                    interval REAL NOT NULL,
+                    next_poll REAL NOT NULL,
+                    last_poll REAL,
+                    rate REAL NOT NULL DEFAULT 0,
+                    quiet_polls INTEGER NOT NULL DEFAULT 0
+                );
+
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+            self.conn.commit()
+
+    # ==================== 已处理条目 ====================
+
+    def is_processed(self, source, item_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM processed_items WHERE source = ? AND item_id = ?",
+                (source, item_id),
+            ).fetchone()
+        return row is not None
+
+    def mark_processed(self, source, item_id, title=None):
+        # 每条立即提交：条目处理完就已推送，进程被强制结束时也不能丢掉处理记录，否则下次会重复推送
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO processed_items (source, item_id, title, processed_at) VALUES (?, ?, ?, ?)",
+                (source, item_id, title, str(datetime.datetime.now())),
+            )
+            self.commit()
+
+    def count_processed(self, source=None):
+        with self.lock:
+            if source is None:
+                row = self.conn.execute("SELECT COUNT(*) FROM processed_items").fetchone()
+            else:
+                row = self.conn.execute(
+                    "SELECT COUNT(*) FROM processed_items WHERE source = ?", (source,)
+                ).fetchone()
+        return row[0]
+
+    # ==================== 首次出现 / 失败次数 ====================
+
+    def mark_seen(self, source, item_ids):
+        """
+        登记订阅列表中出现的条目，返回其中首次出现的条数（即上次轮询以来新发布的条数，重试的旧条目不算）。
+        该源第一次登记时只建立基线，返回 0
+        """
+        now = time.time()
+        with self.lock:
+            baseline = self.conn.execute(
+                "SELECT 1 FROM seen_items WHERE source = ? LIMIT 1", (source,)
+            ).fetchone() is None
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO seen_items (source, item_id, first_seen) VALUES (?, ?, ?)",
+                [(source, item_id, now) for item_id in item_ids if item_id],
+            )
+            added = self.conn.total_changes - before
+            self.commit()
+        return 0 if baseline else added
+
+    def record_failure(self, source, item_id):
+        """记录一次处理失败，返回该条目累计的失败次数"""
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT INTO seen_items (source, item_id, first_seen, failures) VALUES (?, ?, ?, 1)
+                ON CONFLICT(source, item_id) DO UPDATE SET failures = failures + 1
+                """,
+                (source, item_id, time.time()),
+            )
+            row = self.conn.execute(
+                "SELECT failures FROM seen_items WHERE source = ? AND item_id = ?", (source, item_id)
+            ).fetchone()
+            self.commit()
+        return row[0]
+
+    def get_failures(self, source, item_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT failures FROM seen_items WHERE source = ? AND item_id = ?", (source, item_id)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def has_unfinished(self, source):
+        """该源是否还有记录过失败、但尚未标记为已处理的条目"""
+        with self.lock:
+            row = self.conn.execute(
+                """
+                SELECT 1 FROM seen_items s
+                WHERE s.source = ? AND s.failures > 0
+                  AND NOT EXISTS (SELECT 1 FROM processed_items p WHERE p.source = s.source AND p.item_id = s.item_id)
+                LIMIT 1
+                """,
+                (source,),
+            ).fetchone()
+        return row is not None
+
+    # ==================== 订阅源水位 ====================
+
+    def get_watermark(self, source):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT last_id, last_published, title, updated_at FROM watermarks WHERE source = ?",
+                (source,),
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'last_id': row[0],
+            'last_published': row[1],
+            'title': row[2],
+            'updated_at': row[3],
+        }
+
+    def set_watermark(self, source, last_id, title=None, last_published=None):
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT INTO watermarks (source, last_id, last_published, title, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(source) DO UPDATE SET
+                    last_id = excluded.last_id,
+                    last_published = COALESCE(excluded.last_published, watermarks.last_published),
+                    title = excluded.title,
+                    updated_at = excluded.updated_at
+                """,
+                (source, last_id, last_published, title, str(datetime.datetime.now())),
+            )
+            self.commit()
+
+    # ==================== 轮询计划 ====================
+
+    def get_schedule(self, source):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT interval, next_poll, last_poll, rate, quiet_polls FROM poll_schedule WHERE source = ?",
+                (source,),
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'interval': row[0],
+            'next_poll': row[1],
+            'last_poll': row[2],
+            'rate': row[3],
+            'quiet_polls': row[4],
+        }
+
+    def set_schedule(self, source, interval, next_poll, last_poll, rate, quiet_polls):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO poll_schedule (source, interval, next_poll, last_poll, rate, quiet_polls) VALUES (?, ?, ?, ?, ?, ?)",
+                (source, interval, next_poll, last_poll, rate, quiet_polls),
+            )
+            self.commit()
+
+    # ==================== 事务 ====================
+
+    def commit(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            if self.conn is None:
+                return
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+    # ==================== 旧数据迁移 ====================
+
+    def migrate_json_history(self, rss_history_file=LEGACY_RSS_HISTORY_FILE, wewe_history_file=LEGACY_WEWE_HISTORY_FILE):
+        """导入旧版 history.json / wewe_history.json（每个文件只导入一次，原文件保留作备份）"""
+        if self._needs_migration(rss_history_file):
+            history = self._load_json(rss_history_file)
+            if isinstance(history, dict):
+                self._import_rss_history(history)
+                self._finish_migration(rss_history_file, len(history))
+
+        if self._needs_migration(wewe_history_file):
+            urls = self._load_json(wewe_history_file)
+            if isinstance(urls, list):
+                self._import_wewe_history(urls)
+                self._finish_migration(wewe_history_file, len(urls))
+
+    def _import_rss_history(self, history):
+        now = str(datetime.datetime.now())
+        rows = [
+            (rss_url, info['last_id'], info.get('title'), info.get('updated_at') or now)
+            for rss_url, info in history.items()
+            if isinstance(info, dict) and info.get('last_id')
+        ]
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO watermarks (source, last_id, title, updated_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO processed_items (source, item_id, title, processed_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def _import_wewe_history(self, urls):
+        now = str(datetime.datetime.now())
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO processed_items (source, item_id, title, processed_at) VALUES (?, ?, NULL, ?)",
+                [(WEWE_SOURCE, url, now) for url in urls if url],
+            )
+
+    def _needs_migration(self, path):
+        if not os.path.exists(path):
+            return False
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM meta WHERE key = ?", (f"migrated:{os.path.abspath(path)}",)
+            ).fetchone()
+        return row is None
+
+    def _finish_migration(self, path, count):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (f"migrated:{os.path.abspath(path)}", str(datetime.datetime.now())),
+            )
+            self.conn.commit()
+        print(f"📦 已从 {path} 导入 {count} 条历史记录到 {self.db_path}")
+
+    def _load_json(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ 读取 {path} 失败，跳过迁移: {e}")
+            return None
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_state_store():
+    """进程内共享的默认状态库"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = StateStore()
+        return _default_store
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+import llm_json
+from llm_json import parse_llm_json
+
+
+def test_fenced_json_with_code_fences_in_strings():
+    """整段回复被代码块包住、字符串里又含有 ``` 时，只去掉外壳，记录完整保留"""
+    records = [
+        {"record_key": "L1-001", "详情": "示例：\n```python\nprint('hi')\n```\n结束"},
+        {"record_key": "L1-002", "详情": "```bash\npip install x\n```"},
+    ]
+    body = json.dumps({"records": records}, ensure_ascii=False, indent=2)
+
+    for content in (body, f"```json\n{body}\n```"):
+        data, report = parse_llm_json(content)
+        assert data == {"records": records}
+        assert not report["truncated"]
+
+
+def test_truncated_records_keep_complete_items():
+    """输出在记录数组中途被截断时，保留写完的记录，丢弃写了一半的那条"""
+    content = (
+        '{"lesson_id": "L1", "records": [\n'
+        '  {"record_key": "L1-001", "fields": {"标题": "第一条"}},\n'
+        '  {"record_key": "L1-002", "fields": {"标题": "第二条"}},\n'
+        '  {"record_key": "L1-003", "fields": {"标题": "第三'
+    )
+    data, report = parse_llm_json(content)
+    assert report["truncated"]
+    assert data["lesson_id"] == "L1"
+    assert [record["record_key"] for record in data["records"]] == ["L1-001", "L1-002"]
+    assert report["recovered_records"] == 2
+    assert report["recovered_record_keys"] == ["L1-001", "L1-002"]
+
+
+def test_trailing_commas_are_removed():
+    data, report = parse_llm_json('{"records": [{"a": 1,}, {"a": 2},], "warnings": [],}')
+    assert data == {"records": [{"a": 1}, {"a": 2}], "warnings": []}
+    assert report["repaired"]
+    assert not report["truncated"]
+
+
+def test_bare_newlines_in_strings_are_escaped():
+    data, report = parse_llm_json('{"records": [{"详情": "第一行\n第二行\t缩进"}]}')
+    assert data == {"records": [{"详情": "第一行\n第二行\t缩进"}]}
+    assert report["repaired"]
+
+
+def test_parse_cached_reply_fills_structure_and_drops_truncated_reply(monkeypatch):
+    """被截断的回复合并进空结构并从缓存删除，完整的回复保留在缓存中"""
+    invalidated = []
+
+    class FakeCache:
+        def invalidate(self, cache_key):
+            invalidated.append(cache_key)
+
+    monkeypatch.setattr(llm_json, "get_llm_cache", lambda: FakeCache())
+    empty = {"基础信息": {"题目": "", "公司": ""}, "分析": {}, "warnings": []}
+
+    result, report = llm_json.parse_cached_reply(
+        {"content": '{"基础信息": {"题目": "设计短链"}, "分析": {"要点": "缓', "cache_key": "k1"},
+        records_key=None,
+        empty_structure=empty,
+    )
+    assert report["truncated"]
+    assert result["基础信息"] == {"题目": "设计短链", "公司": ""}
+    assert result["warnings"] == []
+    assert invalidated == ["k1"]
+
+    result, report = llm_json.parse_cached_reply({"content": '{"records": []}', "cache_key": "k2"})
+    assert result == {"records": []}
+    assert invalidated == ["k1"]
+
+    with pytest.raises(ValueError):
+        llm_json.parse_cached_reply({"content": "完全不是 JSON", "cache_key": "k3"})
+    assert invalidated == ["k1", "k3"]
@@ -2,7 +2,6 @@
 # -*- coding: utf-8 -*-
 
 import os
-import sys
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -10,6 +9,9 @@ load_dotenv()
 
 # 导入自定义模块
 from rss_manager import RSSManager
+from feed_poller import FeedPoller
+from dedup_index import DedupIndex
+from scheduler import PollScheduler
 from media_handler import MediaHandler
 from gemini_agent import GeminiAgent
 from feishu_pusher import FeishuPusher
@@ -24,6 +26,7 @@ def test_rss_video_processing():
     media_handler = MediaHandler()
     gemini_agent = GeminiAgent()
     feishu_pusher = FeishuPusher()
+    dedup_index = DedupIndex()
 
     # 获取RSS源配置
     rss_feeds = os.getenv("RSS_FEEDS", "").split(",")
@@ -37,89 +40,124 @@ def test_rss_video_processing():
     test_mode = os.getenv("TEST_MODE", "false").lower() == "true"
     feeds_to_process = rss_feeds[:1] if test_mode else rss_feeds
 
-    for i, rss_url in enumerate(feeds_to_process, 1):
-        print(f"\n📡 [{i}/{len(feeds_to_process)}] 处理RSS源: {rss_url}")
+    # 只轮询到期的订阅（按各自发布频率自适应安排）
+    scheduler = PollScheduler()
+    due_feeds = scheduler.due_sources(feeds_to_process)
+    print(f"⏰ 到期订阅 {len(due_feeds)}/{len(feeds_to_process)} 个")
 
-        # 1. 获取最新视频信息
-        latest_entry = rss_manager.parse_feed(rss_url)
-        if not latest_entry:
-            print("   ❌ 无法获取RSS内容")
-            continue
-
-        # 提取视频信息
-        video_title = latest_entry.get('title', 'Unknown Title')
-        video_link = latest_entry.get('link', '')
-        video_id = latest_entry.get('id', video_link.split('/')[-1] if video_link else '')
+    # 并发拉取所有订阅，总耗时约等于最慢的一个源
+    poll_results = FeedPoller(rss_manager).poll_all(due_feeds)
 
-        print(f"   📹 视频标题: {video_title}")
-        print(f"   🔗 视频链接: {video_link}")
+    for i, poll_result in enumerate(poll_results, 1):
+        rss_url = poll_result['url']
+        print(f"\n📡 [{i}/{len(poll_results)}] 处理RSS源: {rss_url}")
 
-        # 2. 检查是否为新视频
-        if not rss_manager.is_new(rss_url, video_id):
-            print("   ⏭️  视频已处理过，跳过")
+        if poll_result['error']:
+            print(f"   ❌ 无法获取RSS内容: {poll_result['error']}")
             continue
 
-        print("   🆕 发现新视频，开始处理...")
-
-        # 3. 下载音频并转录
-        if video_link:
-            transcript = media_handler.process_link(video_link)
-
-            if transcript:
-                print(f"   ✅ 转录成功，长度: {len(transcript)} 字符")
-
-                # 4. AI分析
-                print("   🧠 开始AI分析...")
-                analysis_result = gemini_agent.analyze_content(
-                    transcript,
-                    video_title,
-                    source_type="YouTube视频",
-                    original_link=video_link
-                )
-
-                if analysis_result:
-                    print("   ✅ AI分析完成")
-
-                    # 显示部分分析结果
-                    metadata = analysis_result.get("基础元数据", {})
-                    tech_attrs = analysis_result.get("技术与属性", {})
-                    ai_analysis = analysis_result.get("AI深度分析", {})
-
-                    print(f"   📊 分析结果:")
-                    print(f"      - 标题: {metadata.get('新闻标题', '')}")
-                    print(f"      - 领域: {tech_attrs.get('所属领域', [])}")
-                    print(f"      - 商业潜力: {ai_analysis.get('商业潜力', '')}")
-                    print(f"      - 摘要: {ai_analysis.get('一句话摘要', '')[:100]}...")
-
-                    # 5. 推送到飞书
-                    print("   📤 推送到飞书...")
-                    try:
-                        # 构建原始数据
-                        raw_data = {
-                            'title': video_title,
-                            'link': video_link,
-                            'description': latest_entry.get('summary', ''),
-                            'published': latest_entry.get('published', ''),
-                            'transcript': transcript
-                        }
-
-                        success = feishu_pusher.push_to_feishu(raw_data, analysis_result)
-                        if success:
-                            print("   ✅ 飞书推送成功")
-                        else:
-                            print("   ❌ 飞书推送失败")
-                    except Exception as e:
-                        print(f"   ❌ 飞书推送出错: {e}")
+        # 只按首次出现的条目估算发布频率，重试的旧条目不算新发布（要在取新条目之前登记）
+        first_seen_count = rss_manager.count_first_seen(rss_url, poll_result['entries'])
+
+        # 1. 增量获取所有新视频（从旧到新），多个视频并发下载转录，转录的同时在后台分析已就绪的分块
+        new_count = 0
+        new_entries = rss_manager.get_new_entries(rss_url, entries=poll_result['entries'])
+        analysis_streams = {}
+
+        def start_analysis(entry):
+            # 转录到第一个分块时先按开头查重，疑似重复时暂停后台分析，等全文查重后再决定
+            stream = gemini_agent.start_content_stream(
+                entry.get('title', 'Unknown Title'),
+                source_type="YouTube视频",
+                original_link=entry.get('link', ''),
+                check_duplicate=lambda text: dedup_index.find_duplicate(text, head=True)
+            )
+            analysis_streams[entry.get('link', '')] = stream
+            return stream.feed
+
+        for entry, transcript in media_handler.iter_process_links(
+            new_entries, get_link=lambda e: e.get('link', ''), get_on_text=start_analysis
+        ):
+            new_count += 1
+            # 提取视频信息
+            video_title = entry.get('title', 'Unknown Title')
+            video_link = entry.get('link', '')
+            stream = analysis_streams.pop(video_link, None)
+
+            print(f"   📹 视频标题: {video_title}")
+            print(f"   🔗 视频链接: {video_link}")
+
+            print("   🆕 发现新视频，开始处理...")
+
+            # 2. 下载音频并转录（已在后台完成）
+            if video_link:
+                # 同一条新闻可能已在其他频道/公众号分析过
+                # 开头相似只是提前暂停分析的理由，是否跳过以全文查重为准
+                duplicate = dedup_index.find_duplicate(transcript) if transcript else None
+
+                if duplicate:
+                    print(f"   ♻️ 与已处理内容重复（{duplicate['title'][:30]}，距离 {duplicate['distance']}），跳过AI分析")
+                    dedup_index.add(transcript, rss_url, video_link, video_title, duplicate_of=duplicate['id'])
+                    stream.cancel()
+                elif transcript:
+                    print(f"   ✅ 转录成功，长度: {len(transcript)} 字符")
+
+                    # 3. AI分析（转录期间已就绪的分块已在后台分析，这里等待剩余部分；开头疑似重复而暂停的从头分析全文）
+                    if stream.head_duplicate:
+                        print("   🔁 开头与已处理内容相似但全文不重复，分析完整转录")
+                    print("   🧠 开始AI分析...")
+                    analysis_result = stream.finish()
+
+                    if gemini_agent.is_analysis_ok(analysis_result):
+                        print("   ✅ AI分析完成")
+                        dedup_index.add(transcript, rss_url, video_link, video_title)
+
+                        # 显示部分分析结果
+                        metadata = analysis_result.get("基础元数据", {})
+                        tech_attrs = analysis_result.get("技术与属性", {})
+                        ai_analysis = analysis_result.get("AI深度分析", {})
+
+                        print(f"   📊 分析结果:")
+                        print(f"      - 标题: {metadata.get('新闻标题', '')}")
+                        print(f"      - 领域: {tech_attrs.get('所属领域', [])}")
+                        print(f"      - 商业潜力: {ai_analysis.get('商业潜力', '')}")
+                        print(f"      - 摘要: {ai_analysis.get('一句话摘要', '')[:100]}...")
+
+                        # 4. 推送到飞书
+                        print("   📤 推送到飞书...")
+                        try:
+                            # 构建原始数据
+                            raw_data = {
+                                'title': video_title,
+                                'link': video_link,
+                                'description': entry.get('summary', ''),
+                                'published': entry.get('published', ''),
+                                'transcript': transcript
+                            }
+
+                            success = feishu_pusher.push_to_feishu(raw_data, analysis_result)
+                            if success:
+                                print("   ✅ 飞书推送成功")
+                            else:
+                                print("   ❌ 飞书推送失败")
+                        except Exception as e:
+                            print(f"   ❌ 飞书推送出错: {e}")
+                    else:
+                        print("   ❌ AI分析失败")
                 else:
-                    print("   ❌ AI分析失败")
+                    stream.cancel()
+                    print("   ❌ 转录失败")
             else:
-                print("   ❌ 转录失败")
-        else:
-            print("   ❌ 没有视频链接")
+                print("   ❌ 没有视频链接")
+
+            # 5. 更新历史记录
+            rss_manager.mark_entry_processed(rss_url, entry)
+            print("   📝 历史记录已更新")
 
-        # 6. 更新历史记录
-        rss_manager.update_history(rss_url, video_id, video_title)
-        print("   📝 历史记录已更新")
+        rss_manager.finish_entries(rss_url)
+        if new_count == 0:
+            print("   ⏭️  没有新视频")
+        scheduler.record_poll(rss_url, first_seen_count)
 
 def main():
     """主函数"""
@@ -0,0 +1,14 @@
+from text_chunker import estimate_tokens, split_text
+
+
+def test_short_sentences_fill_each_chunk():
+    """短句很多的文本每块也要装满预算，拼接后与原文一致"""
+    text = "".join(f"第{i}句话很短。" for i in range(5000))
+    chunks = split_text(text, 2000)
+
+    assert "".join(chunk for chunk, _ in chunks) == text
+    assert [offset for _, offset in chunks] == [sum(len(chunk) for chunk, _ in chunks[:i]) for i in range(len(chunks))]
+    for chunk, _ in chunks:
+        assert estimate_tokens(chunk) <= 2000
+    for chunk, _ in chunks[:-1]:
+        assert estimate_tokens(chunk) >= 2000 * 0.97
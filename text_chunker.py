@@ -0,0 +1,190 @@
+import os
+import re
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# 各模型的上下文窗口（tokens），按模型名前缀匹配；可用 LLM_CONTEXT_TOKENS 覆盖
+MODEL_CONTEXT_TOKENS = {
+    "glm-4-long": 1000000,
+    "glm-4": 128000,
+    "glm-z1": 128000,
+    "gpt-4o": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5": 16385,
+}
+DEFAULT_CONTEXT_TOKENS = 32000
+# 提示词模板、字段说明等固定部分预留的 tokens
+PROMPT_RESERVED_TOKENS = 3000
+
+CJK_CHAR = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+CODE_FENCE = re.compile(r"^[ \t]*(```|~~~)[^\n]*\n.*?(?:^[ \t]*\1[ \t]*(?:\n|\Z)|\Z)", re.M | re.S)
+# 句末标点（含后面的引号/括号）、英文句号后的空白、换行
+SENTENCE_BREAK = re.compile(r"[。！？!?；;…]+[”’」』\"')）]*[ \t]*\n*|\.(?=\s)[ \t]*\n*|\n+")
+# 没有句读的长文本（如无标点的语音转录）退而在逗号/空白处切分
+WEAK_BREAK = re.compile(r"[，,、：:]\s*|\s+")
+
+_encodings = {}
+
+
+def _encoding(model):
+    """tiktoken 认识该模型时返回对应编码，否则返回 None（使用估算）"""
+    if tiktoken is None or not model:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def estimate_tokens(text, model=None):
+    """
+    估算 token 数：tiktoken 支持的模型精确计数；
+    其他模型（如 GLM）按中文约 0.75 token/字、其他字符约 4 字符/token 估算
+    """
+    if not text:
+        return 0
+    if _encoding(model) is not None:
+        return _raw_tokens(text, model)
+    return _total_tokens(_raw_tokens(text, model))
+
+
+def _raw_tokens(text, model):
+    """可累加的 token 数（估算时不取整、不加 1），分块时逐句相加，整块再由 _total_tokens 取整"""
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(CJK_CHAR.findall(text))
+    return cjk * 0.75 + (len(text) - cjk) / 4
+
+
+def _total_tokens(raw):
+    # 估算值向下取整后多算 1 个 token，每块只加一次（逐句各加 1 会让短句多的文本每块只装到八九成）
+    return int(raw) + 1
+
+
+def context_tokens(model):
+    if os.getenv("LLM_CONTEXT_TOKENS"):
+        return int(os.getenv("LLM_CONTEXT_TOKENS"))
+    for prefix, tokens in MODEL_CONTEXT_TOKENS.items():
+        if (model or "").lower().startswith(prefix):
+            return tokens
+    return DEFAULT_CONTEXT_TOKENS
+
+
+def input_token_budget(model, max_output_tokens, reserved=PROMPT_RESERVED_TOKENS):
+    """单次请求可容纳的正文 tokens：上下文窗口减去输出上限和提示词预留"""
+    return max(1000, context_tokens(model) - max_output_tokens - reserved)
+
+
+def _units(text):
+    """
+    把文本切成首尾相接的最小单元 (start, end, 段落结束)：代码块整体作为一个单元，其余按句切分。
+    所有单元拼起来等于原文，偏移量可直接用于 evidence 定位
+    """
+    units = []
+    position = 0
+    for match in CODE_FENCE.finditer(text):
+        units.extend(_sentence_units(text, position, match.start()))
+        units.append((match.start(), match.end(), True))
+        position = match.end()
+    units.extend(_sentence_units(text, position, len(text)))
+    return units
+
+
+def _sentence_units(text, start, end):
+    units = []
+    position = start
+    for match in SENTENCE_BREAK.finditer(text, start, end):
+        if match.end() > position:
+            units.append((position, match.end(), "\n\n" in match.group()))
+            position = match.end()
+    if position < end:
+        units.append((position, end, True))
+    return units
+
+
+def _hard_split(text, start, end, max_tokens, model):
+    """单个单元超过预算时，按比例在逗号/空白处切开，找不到就直接按字符切"""
+    pieces = []
+    position = start
+    while position < end:
+        remaining = end - position
+        tokens = estimate_tokens(text[position:end], model)
+        if tokens <= max_tokens:
+            pieces.append((position, end, True))
+            break
+        length = max(1, int(remaining * max_tokens / tokens * 0.95))
+        cut = position + length
+        # 在最后 20% 的范围内找一个较弱的断点
+        for match in WEAK_BREAK.finditer(text, position + int(length * 0.8), cut):
+            cut = match.end()
+        pieces.append((position, cut, False))
+        position = cut
+    return pieces
+
+
+def split_text(text, max_tokens, overlap_tokens=0, model=None):
+    """
+    按 token 预算把文本切成若干块，返回 [(chunk_text, start_offset)]：
+    尽量装满每一块；优先在段落边界断开（落在块末 25% 以内时），其次在句子边界，不拆开代码块（超长时除外）；
+    相邻块重叠 overlap_tokens 左右的完整句子，避免跨块的知识点被截断
+    """
+    if not text:
+        return [("", 0)]
+    if estimate_tokens(text, model) <= max_tokens:
+        return [(text, 0)]
+
+    # 各单元的 token 数不取整，按块累加后再换算（见 _total_tokens）
+    units = []
+    for start, end, paragraph_end in _units(text):
+        if estimate_tokens(text[start:end], model) > max_tokens:
+            for piece in _hard_split(text, start, end, max_tokens, model):
+                units.append((*piece, _raw_tokens(text[piece[0]:piece[1]], model)))
+        else:
+            units.append((start, end, paragraph_end, _raw_tokens(text[start:end], model)))
+
+    chunks = []
+    first = 0
+    while first < len(units):
+        # 从 first 开始尽量多装单元
+        last = first
+        total = units[first][3]
+        while last + 1 < len(units) and _total_tokens(total + units[last + 1][3]) <= max_tokens:
+            last += 1
+            total += units[last][3]
+
+        if last + 1 < len(units):
+            # 块末 25% 以内有段落边界时在段落处断开
+            used = 0
+            for index in range(last, first, -1):
+                if units[index][2]:
+                    last = index
+                    break
+                used += units[index][3]
+                if used > max_tokens * 0.25:
+                    break
+
+        chunks.append((text[units[first][0]:units[last][1]], units[first][0]))
+        if last + 1 >= len(units):
+            break
+
+        # 下一块从末尾往回 overlap_tokens 左右的完整句子开始（至少前进一个单元）
+        next_first = last + 1
+        overlap = 0
+        while next_first - 1 > first and overlap + units[next_first - 1][3] <= overlap_tokens:
+            next_first -= 1
+            overlap += units[next_first][3]
+        first = next_first
+    return chunks
+
+
+def truncate_to_tokens(text, max_tokens, model=None):
+    """超过预算时在句子边界截断，返回 (文本, 是否截断)"""
+    if estimate_tokens(text, model) <= max_tokens:
+        return text, False
+    return split_text(text, max_tokens, model=model)[0][0], True
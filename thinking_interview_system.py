@@ -8,10 +8,11 @@ import os
 import json
 import time
 import uuid
-import requests
 from datetime import datetime
 from dotenv import load_dotenv
 from zhipuai import ZhipuAI
+from llm_cache import cached_chat_completion
+from http_client import get_session
 
 load_dotenv()
 
@@ -19,6 +20,7 @@ class ThinkingInterviewSystem:
     """思维导向的面试学习系统"""
 
     def __init__(self):
+        self.session = get_session()
         # 飞书配置
         self.app_id = os.getenv("INTERVIEW_APP_ID")
         self.app_secret = os.getenv("INTERVIEW_APP_SECRET")
@@ -52,7 +54,7 @@ class ThinkingInterviewSystem:
 
         url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
         payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -94,7 +96,7 @@ class ThinkingInterviewSystem:
         }
 
         try:
-            resp = requests.post(url, headers=headers, params=params, json=record_data)
+            resp = self.session.post(url, headers=headers, params=params, json=record_data)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get("code") == 0:
@@ -155,7 +157,8 @@ class ThinkingInterviewSystem:
 """
 
         try:
-            response = self.client.chat.completions.create(
+            response = cached_chat_completion(
+                self.client,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "你是一位优秀的产品经理思考教练，擅长启发式教学。"},
@@ -165,8 +168,8 @@ class ThinkingInterviewSystem:
                 max_tokens=2000
             )
 
-            if response and response.choices:
-                return response.choices[0].message.content.strip()
+            if response["content"]:
+                return response["content"]
             return "AI分析失败"
         except Exception as e:
             print(f"❌ 获取思考指导时出错: {e}")
@@ -208,7 +211,7 @@ class ThinkingInterviewSystem:
         }
 
         try:
-            resp = requests.post(url, headers=headers, json=record_data)
+            resp = self.session.post(url, headers=headers, json=record_data)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get("code") == 0:
@@ -246,7 +249,7 @@ class ThinkingInterviewSystem:
         }
 
         try:
-            resp = requests.patch(url, headers=headers, json=payload)
+            resp = self.session.patch(url, headers=headers, json=payload)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get("code") == 0:
@@ -286,7 +289,7 @@ class ThinkingInterviewSystem:
         }
 
         try:
-            resp = requests.post(url, headers=headers, json=record_data)
+            resp = self.session.post(url, headers=headers, json=record_data)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get("code") == 0:
@@ -0,0 +1,146 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from urllib.parse import urlsplit, parse_qs
+from page_cache import normalize_url
+
+TRANSCRIPT_DIR = "transcripts"
+
+YOUTUBE_ID = re.compile(r"^[0-9A-Za-z_-]{11}$")
+BILIBILI_ID = re.compile(r"(BV[0-9A-Za-z]{10}|av\d+)", re.IGNORECASE)
+
+
+def parse_video_key(url):
+    """
+    从链接解析 (extractor, video_id)，同一视频的不同链接形式得到相同的键：
+    youtube.com/watch?v= / youtu.be/ / shorts/ / live/，bilibili BV 号或 av 号（含分 P）；
+    其他链接使用规范化 URL 的哈希
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().split(":")[0]
+    path_parts = [part for part in parts.path.split("/") if part]
+    query = parse_qs(parts.query)
+
+    if host == "youtu.be" or host.endswith(".youtube.com") or host == "youtube.com":
+        candidates = query.get("v", [])
+        if host == "youtu.be" and path_parts:
+            candidates = [path_parts[0]] + candidates
+        if len(path_parts) >= 2 and path_parts[0] in ("shorts", "live", "embed"):
+            candidates = [path_parts[1]] + candidates
+        for candidate in candidates:
+            if YOUTUBE_ID.match(candidate):
+                return "youtube", candidate
+
+    if host.endswith("bilibili.com"):
+        match = BILIBILI_ID.search(parts.path)
+        if match:
+            video_id = match.group(1)
+            video_id = "av" + video_id[2:] if video_id.lower().startswith("av") else "BV" + video_id[2:]
+            page = query.get("p", ["1"])[0]
+            return "bilibili", video_id if page in ("", "1") else f"{video_id}_p{page}"
+
+    return "url", hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()[:32]
+
+
+def hash_file(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TranscriptStore:
+    """转录结果缓存：按 下载器 + 视频 ID 存放 gzip 压缩的 JSON（含分段结果），音频哈希作为辅助键"""
+
+    def __init__(self, root=None):
+        self.root = root or os.getenv("TRANSCRIPT_DIR", TRANSCRIPT_DIR)
+        self.enabled = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() != "false"
+        self.lock = threading.Lock()
+
+    def _path(self, url):
+        extractor, video_id = parse_video_key(url)
+        return os.path.join(self.root, extractor, f"{video_id}.json.gz")
+
+    def _audio_path(self, audio_hash):
+        return os.path.join(self.root, "by_audio", audio_hash[:2], f"{audio_hash}.json")
+
+    def _load(self, path):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, path, record):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record["updated_at"] = str(datetime.datetime.now())
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _new_record(self, url):
+        extractor, video_id = parse_video_key(url)
+        return {"url": url, "extractor": extractor, "video_id": video_id, "complete": False, "segments": {}}
+
+    def get(self, url):
+        """返回已完成的转录全文，没有则返回 None"""
+        if not self.enabled:
+            return None
+        record = self._load(self._path(url))
+        if record and record.get("complete") and record.get("text"):
+            return record["text"]
+        return None
+
+    def get_segments(self, url):
+        """返回已转录的分段 {index: {'start', 'end', 'text'}}，用于中断后只补转缺失的片段"""
+        if not self.enabled:
+            return {}
+        record = self._load(self._path(url)) or {}
+        return {int(index): segment for index, segment in record.get("segments", {}).items()}
+
+    def save_segment(self, url, index, text, start=None, end=None):
+        if not self.enabled or not text:
+            return
+        path = self._path(url)
+        with self.lock:
+            record = self._load(path) or self._new_record(url)
+            record["segments"][str(index)] = {"start": start, "end": end, "text": text}
+            self._save(path, record)
+
+    def save(self, url, text, audio_hash=None):
+        """保存完整转录；提供音频哈希时同时登记辅助键"""
+        if not self.enabled or not text:
+            return
+        path = self._path(url)
+        with self.lock:
+            record = self._load(path) or self._new_record(url)
+            record.update({"complete": True, "text": text})
+            if audio_hash:
+                record["audio_sha256"] = audio_hash
+            self._save(path, record)
+
+            if audio_hash:
+                audio_path = self._audio_path(audio_hash)
+                os.makedirs(os.path.dirname(audio_path), exist_ok=True)
+                with open(audio_path, "w", encoding="utf-8") as f:
+                    json.dump({"transcript": os.path.relpath(path, self.root), "url": url}, f, ensure_ascii=False)
+
+    def get_by_audio(self, audio_hash):
+        """按音频内容哈希查找转录（同一音频的不同链接/转载）"""
+        if not self.enabled or not audio_hash:
+            return None
+        try:
+            with open(self._audio_path(audio_hash), "r", encoding="utf-8") as f:
+                pointer = json.load(f)
+        except (OSError, ValueError):
+            return None
+        record = self._load(os.path.join(self.root, pointer["transcript"]))
+        if record and record.get("complete") and record.get("text"):
+            return record["text"]
+        return None
@@ -1,55 +1,74 @@
 # wewe_handler.py
-import requests
 import json
 import os
 import time
-from bs4 import BeautifulSoup
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse
+from article_extractor import extract_article_text
+from feed_cache import get_feed_cache
+from page_cache import PageCache
+from state_store import get_state_store, WEWE_SOURCE
 
 class WeWeHandler:
     def __init__(self):
         self.rss_url = os.getenv("WEWE_RSS_URL")
-        self.history_file = "wewe_history.json"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         }
-        self.load_history()
-
-    def load_history(self):
-        if os.path.exists(self.history_file):
-            with open(self.history_file, 'r', encoding='utf-8') as f:
-                self.history = json.load(f)
-        else:
-            self.history = []
-
-    def save_history(self):
-        with open(self.history_file, 'w', encoding='utf-8') as f:
-            json.dump(self.history, f, ensure_ascii=False, indent=2)
+        # 并发抓取配置：全局并发数 + 单个域名的并发上限（微信文章都在 mp.weixin.qq.com）
+        self.fetch_concurrency = int(os.getenv("WEWE_FETCH_CONCURRENCY", "4"))
+        self.per_host_concurrency = int(os.getenv("WEWE_PER_HOST_CONCURRENCY", "2"))
+        self.feed_cache = get_feed_cache()
+        self.page_cache = PageCache()
+        self.store = get_state_store()
+        # 正文连续获取失败多少次后放弃该文章（标记为已处理），避免失效链接每轮都被重新列出
+        self.max_fetch_failures = int(os.getenv("WEWE_MAX_FETCH_FAILURES", "3"))
+        # 最近一次拉取列表时首次出现的文章数，供轮询计划估算发布频率
+        self.first_seen_count = 0
+        # 最近一次拉取列表失败的原因（成功时为 None），失败的轮询不能当作“没有新文章”
+        self.fetch_error = None
 
     def is_processed(self, url):
-        return url in self.history
+        return self.store.is_processed(WEWE_SOURCE, url)
+
+    def mark_processed(self, url, title=None):
+        self.store.mark_processed(WEWE_SOURCE, url, title)
 
-    def mark_processed(self, url):
-        self.history.append(url)
-        # 保持历史记录在一定大小，防止无限膨胀
-        if len(self.history) > 1000:
-            self.history = self.history[-1000:]
-        self.save_history()
+    def record_fetch_failure(self, url, title=None):
+        """记录一次正文获取失败；累计达到上限时标记为已处理并返回 True"""
+        if self.store.record_failure(WEWE_SOURCE, url) < self.max_fetch_failures:
+            return False
+        self.mark_processed(url, title)
+        return True
 
     def fetch_article_list(self):
         """获取文章列表"""
+        self.first_seen_count = 0
+        self.fetch_error = None
         if not self.rss_url:
             print("❌ 未设置 WEWE_RSS_URL")
+            self.fetch_error = "未设置 WEWE_RSS_URL"
             return []
 
         try:
             print(f"📡 正在请求 WeWe RSS: {self.rss_url} ...")
-            response = requests.get(self.rss_url, timeout=15)
-            response.raise_for_status()
-            data = response.json()
+            body = self.feed_cache.fetch(self.rss_url, timeout=15)
+            if body is None:
+                print("💤 WeWe RSS 未更新，跳过解析")
+                return []
+
+            try:
+                data = json.loads(body)
+            except ValueError:
+                self.feed_cache.invalidate(self.rss_url)
+                raise
 
             items = data.get('items', [])
             new_items = []
+            self.first_seen_count = self.store.mark_seen(
+                WEWE_SOURCE, [item.get('url') or item.get('id') for item in items]
+            )
 
             for item in items:
                 url = item.get('url') or item.get('id')
@@ -61,41 +80,76 @@ class WeWeHandler:
                         'id': item.get('id')
                     })
 
+            # 有未处理的文章时不保留条件请求缓存：处理失败、测试模式跳过或进程中途退出，
+            # 下次运行都会完整拉取列表，不会被 304 / 内容哈希未变挡住；全部处理完后的下一次拉取会重新建立缓存
+            if new_items:
+                self.feed_cache.invalidate(self.rss_url)
             print(f"🔍 发现 {len(items)} 篇文章，其中 {len(new_items)} 篇为新文章")
             return new_items
 
         except Exception as e:
             print(f"❌ 获取 RSS 列表失败: {e}")
+            self.fetch_error = str(e)
             return []
 
     def get_article_content(self, url, max_retries=3):
         """获取并清洗文章内容"""
         for attempt in range(max_retries):
             try:
-                response = requests.get(url, headers=self.headers, timeout=15)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser', from_encoding='utf-8')
-
-                # 移除干扰元素
-                for script in soup(["script", "style", "iframe", "nav", "footer"]):
-                    script.decompose()
-
-                # 优先查找微信正文区域
-                content_div = soup.find('div', id='js_content') or \
-                              soup.find('div', class_='rich_media_content') or \
-                              soup.find('div', class_='content')
-
-                if content_div:
-                    text = content_div.get_text(separator='\n', strip=True)
-                else:
-                    text = soup.get_text(separator='\n', strip=True)
-
-                # 简单的文本清洗
-                lines = [line.strip() for line in text.split('\n') if line.strip()]
-                return '\n'.join(lines)
+                html = self.page_cache.fetch(url, headers=self.headers, timeout=15)
+                # 移除干扰元素，优先查找微信正文区域
+                strip_tags = ("script", "style", "iframe", "nav", "footer")
+                content = extract_article_text(html, strip_tags=strip_tags)
+                if content:
+                    return content
+
+                # 没有正文区域（验证页、空页面等）：不保留缓存，下次重新下载；本次退回整页文本
+                self.page_cache.invalidate(url)
+                content = extract_article_text(html, strip_tags=strip_tags, fallback_to_page=True)
+                if content:
+                    return content
+                raise ValueError("页面没有可提取的内容")
 
             except Exception as e:
                 print(f"  ⚠️ 获取内容重试 ({attempt+1}/{max_retries}): {e}")
                 time.sleep(2)
 
-        return None
\ No newline at end of file
+        return None
+
+    def iter_article_contents(self, articles, max_workers=None):
+        """并发获取多篇文章内容，按完成顺序逐篇返回 (article, content)"""
+        if not articles:
+            return
+
+        max_workers = max(1, min(max_workers or self.fetch_concurrency, len(articles)))
+        per_host = max(1, self.per_host_concurrency)
+
+        # 按域名排队，只有该域名还有空位时才提交，避免占满全局线程却在等同一个域名
+        pending = {}
+        for article in articles:
+            pending.setdefault(urlparse(article['url']).netloc, deque()).append(article)
+        host_running = {host: 0 for host in pending}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while pending or running:
+                for host in list(pending):
+                    queue = pending[host]
+                    while queue and len(running) < max_workers and host_running[host] < per_host:
+                        article = queue.popleft()
+                        future = pool.submit(self.get_article_content, article['url'])
+                        running[future] = (article, host)
+                        host_running[host] += 1
+                    if not queue:
+                        del pending[host]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    article, host = running.pop(future)
+                    host_running[host] -= 1
+                    try:
+                        content = future.result()
+                    except Exception as e:
+                        print(f"  ⚠️ 获取内容失败: {e}")
+                        content = None
+                    yield article, content
@@ -1,10 +1,9 @@
 import os
-import json
-import requests
-from bs4 import BeautifulSoup
 import time
-from datetime import datetime
-import hashlib
+from article_extractor import extract_article_text
+from page_cache import PageCache
+from http_client import get_session
+from state_store import get_state_store, WEWE_SOURCE
 
 class WeWeScraper:
     """微信文章爬取器"""
@@ -12,30 +11,15 @@ class WeWeScraper:
     def __init__(self):
         self.rss_url = os.getenv("WEWE_RSS_URL")
         self.save_dir = "wewe_articles"
-        self.history_file = "wewe_history.json"
-        self.history = self.load_history()
+        self.store = get_state_store()
+        self.page_cache = PageCache()
 
         # 创建保存目录
         if not os.path.exists(self.save_dir):
             os.makedirs(self.save_dir)
 
-    def load_history(self):
-        """加载已下载的历史记录"""
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return set(json.load(f))
-            except:
-                return set()
-        return set()
-
-    def save_history(self):
-        """保存下载记录"""
-        try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(list(self.history), f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存历史记录失败: {e}")
+    def is_processed(self, url):
+        return self.store.is_processed(WEWE_SOURCE, url)
 
     def get_article_content(self, url, max_retries=3):
         """获取微信文章的文字内容"""
@@ -45,20 +29,13 @@ class WeWeScraper:
 
         for attempt in range(max_retries):
             try:
-                response = requests.get(url, headers=headers, timeout=15)
-                response.raise_for_status()
-                response.encoding = 'utf-8'
-                soup = BeautifulSoup(response.content, 'html.parser', from_encoding='utf-8')
-
-                content_div = soup.find('div', id='js_content')
-                if content_div:
-                    # 移除脚本和样式
-                    for script in content_div(["script", "style"]):
-                        script.decompose()
-                    content = content_div.get_text(separator='\n', strip=True)
-                    lines = [line.strip() for line in content.split('\n') if line.strip()]
-                    return '\n'.join(lines)
-                return None
+                html = self.page_cache.fetch(url, headers=headers, timeout=15)
+                content = extract_article_text(html, selectors=(('id', 'js_content'),))
+                if not content:
+                    # 验证页、空页面等不保留缓存，重试时重新下载
+                    self.page_cache.invalidate(url)
+                    raise ValueError("页面没有正文")
+                return content
             except Exception as e:
                 if attempt < max_retries - 1:
                     time.sleep(2)
@@ -73,7 +50,7 @@ class WeWeScraper:
             return []
 
         try:
-            response = requests.get(self.rss_url, timeout=15)
+            response = get_session().get(self.rss_url, timeout=15)
             response.raise_for_status()
             data = response.json()
 
@@ -94,7 +71,7 @@ class WeWeScraper:
             return None
 
         # 去重检查
-        if url in self.history:
+        if self.is_processed(url):
             return None
 
         print(f"正在处理微信文章: {title}")
@@ -116,7 +93,7 @@ class WeWeScraper:
                 self.id = url
 
         # 添加到历史记录
-        self.history.add(url)
+        self.store.mark_processed(WEWE_SOURCE, url, title)
 
         return ArticleEntry(title, url, author, date, content)
 
@@ -133,7 +110,7 @@ class WeWeScraper:
                 articles.append(article)
                 time.sleep(2)  # 礼貌爬虫
 
-        # 保存历史记录
-        self.save_history()
+        # 提交历史记录
+        self.store.commit()
 
         return articles
\ No newline at end of file